@@ -0,0 +1,206 @@
+import math
+from typing import List
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from LookupGridBase import LookupGridBase
+from Vector import Vector
+
+
+class ArrayLookupGrid(LookupGridBase):
+    """
+    alternative backend for LookupGrid (same addStreamline() / isPointValid() API)
+
+    the sample points are not stored as Vector objects in per-cell lists, but in one numpy array, with a block per row
+    of the grid. Within the block of a row the sample points are sorted by column (like a CSR matrix):
+
+        _coords[_rowStarts[row] + _offsets[row, col]:_rowStarts[row] + _offsets[row, col + 1]]   are the sample points of cell (col, row)
+
+    so the 3 cells of a row of the 3x3 neighbourhood are one contiguous slice and a query compares the distances to
+    all samples of the neighbourhood in one vectorized step.
+    A block has spare capacity; inserting a streamline only shifts the samples of the rows it crosses, a full block is
+    moved to the end of the array with twice the capacity (the array grows by doubling as well).
+
+    The squared distances are compared. Seed point candidates are placed at exactly dSep from a sample point, so for
+    the rare pairs at minDistance up to rounding the result is decided with the expression of Vector.distanceTo()
+    (which LookupGrid uses): the results are exactly those of LookupGrid.
+    """
+
+    BATCHED_QUERIES = True
+    ROW_MIN_CAPACITY = 16 # initial capacity of the block of a row (sample points)
+    TIE_TOLERANCE = 1e-12 # relative, squared distances nearer to minDistance ** 2 are decided like LookupGrid
+
+    def __init__(self, bbox: BoundingBox, dSep: float):
+        super().__init__(bbox, dSep)
+
+        self._coords: np.ndarray = np.empty((0, 2), dtype=np.float64) # the blocks of the rows
+        self._size: int = 0 # used part of _coords (including moved blocks)
+        self._rowStarts: np.ndarray = np.zeros(self.numRows, dtype=np.int64) # start of the block of each row in _coords
+        self._rowCapacities: np.ndarray = np.zeros(self.numRows, dtype=np.int64)
+        self._offsets: np.ndarray = np.zeros((self.numRows, self.numCols + 1), dtype=np.int64) # cells, relative to the block of the row
+        self._numSamplePoints: int = 0
+
+    def numSamplePoints(self) -> int:
+        return self._numSamplePoints
+
+    def addSamplePoint(self, point: Vector):
+        self.addPoints(np.array([[point.x, point.y]], dtype=np.float64))
+
+    def addStreamline(self, streamline: List[Vector]):
+        self.addPoints(np.array([(pt.x, pt.y) for pt in streamline], dtype=np.float64).reshape(-1, 2))
+
+    def addPoints(self, points: np.ndarray):
+        """
+        bulk insertion of sample points, points is an array of shape (N, 2)
+        """
+        if len(points) == 0:
+            return
+        self._assertPointsInBounds(points)
+
+        cols = np.floor((points[:, 0] - self.bbox.topLeft.x) / self.dSep).astype(np.int64)
+        rows = np.floor((points[:, 1] - self.bbox.topLeft.y) / self.dSep).astype(np.int64)
+        order = np.lexsort((cols, rows)) # stable, keeps the insertion order within a cell
+        cols = cols[order]
+        rows = rows[order]
+        points = points[order]
+
+        bounds = [0] + (np.flatnonzero(np.diff(rows)) + 1).tolist() + [len(points)]
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            self._insertIntoRow(int(rows[start]), cols[start:end], points[start:end])
+        self._numSamplePoints += len(points)
+
+    def _insertIntoRow(self, row: int, cols: np.ndarray, points: np.ndarray):
+        """
+        internal helper, inserts the points (sorted by column) into the block of the row, after the samples already
+        in the same cell
+        """
+        offsets = self._offsets[row] # a view
+        count = int(offsets[-1])
+        newCount = count + len(points)
+        start = int(self._rowStarts[row])
+        merged = np.insert(self._coords[start:start + count], offsets[cols + 1], points, axis=0)
+
+        if newCount > self._rowCapacities[row]:
+            capacity = max(2 * newCount, self.ROW_MIN_CAPACITY)
+            start = self._allocate(capacity)
+            self._rowStarts[row] = start
+            self._rowCapacities[row] = capacity
+        self._coords[start:start + newCount] = merged
+        offsets[1:] += np.cumsum(np.bincount(cols, minlength=self.numCols))
+
+    def _allocate(self, capacity: int) -> int:
+        """
+        internal helper, a block of capacity sample points at the end of _coords, returns its start
+        """
+        if self._size + capacity > len(self._coords):
+            coords = np.empty((max(2 * len(self._coords), self._size + capacity), 2), dtype=np.float64)
+            coords[:self._size] = self._coords[:self._size]
+            self._coords = coords
+        start = self._size
+        self._size += capacity
+
+        return start
+
+    def _nearerThan(self, dx: np.ndarray, dy: np.ndarray, minDistance: float) -> np.ndarray:
+        """
+        internal helper, True where the distance (dx, dy: query point - sample point) is < minDistance, decided
+        exactly like LookupGrid does (see above)
+        """
+        squared = dx * dx + dy * dy
+        limit = minDistance * minDistance
+        nearer = squared < limit * (1 - self.TIE_TOLERANCE)
+        ties = np.flatnonzero(np.abs(squared - limit) <= limit * self.TIE_TOLERANCE)
+        for idx, x, y in zip(ties.tolist(), dx[ties].tolist(), dy[ties].tolist()):
+            nearer[idx] = math.sqrt(x ** 2 + y ** 2) < minDistance # python floats, as Vector.distanceTo()
+
+        return nearer
+
+    def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+        """
+        1st) checks if pt is inside ouf bounds of the grid
+        2nd) returns True if all points inside this grid have distance to passed pt >= minDistance, False otherwise
+        """
+        if self.stats is not None:
+            self.stats.numGridQueries += 1
+        if self._isOutside(pt):
+            return False
+
+        cx: int = self.gridX(pt.x)
+        cy: int = self.gridY(pt.y)
+        col0 = max(cx - 1, 0)
+        col1 = min(cx + 1, self.numCols - 1)
+
+        # ---- collect the (up to 3) contiguous row slices of the 3x3 neighbourhood
+        slices = []
+        for idxRow in range(max(cy - 1, 0), min(cy + 1, self.numRows - 1) + 1):
+            rowStart = self._rowStarts[idxRow]
+            start = rowStart + self._offsets[idxRow, col0]
+            end = rowStart + self._offsets[idxRow, col1 + 1]
+            if end > start:
+                slices.append(self._coords[start:end])
+                if self.stats is not None:
+                    self.stats.numGridCellVisits += int(np.count_nonzero(np.diff(self._offsets[idxRow, col0:col1 + 2])))
+
+        if not slices:
+            return True
+
+        samples = slices[0] if len(slices) == 1 else np.concatenate(slices)
+        if self.stats is not None:
+            self.stats.numGridPointsCompared += len(samples)
+        dx = pt.x - samples[:, 0]
+        dy = pt.y - samples[:, 1]
+        minSquared = (dx * dx + dy * dy).min()
+        limit = minDistance * minDistance
+        if minSquared > limit * (1 + self.TIE_TOLERANCE):
+            return True
+        if minSquared < limit * (1 - self.TIE_TOLERANCE):
+            return False
+
+        return not bool(self._nearerThan(dx, dy, minDistance).any())
+
+    def arePointsValid(self, points: np.ndarray, minDistance: float) -> np.ndarray:
+        """
+        batched version of isPointValid() for an array of shape (N, 2), returns a bool array of shape (N,)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.stats is not None:
+            self.stats.numGridQueries += len(points)
+        valid = ~self._outsideMask(points)
+        idxInside = np.flatnonzero(valid)
+        if len(idxInside) == 0 or self._numSamplePoints == 0:
+            return valid
+
+        inside = points[idxInside]
+        cx = np.floor((inside[:, 0] - self.bbox.topLeft.x) / self.dSep).astype(np.int64)
+        cy = np.floor((inside[:, 1] - self.bbox.topLeft.y) / self.dSep).astype(np.int64)
+        col0 = np.maximum(cx - 1, 0)
+        col1 = np.minimum(cx + 1, self.numCols - 1)
+        tooNear = np.zeros(len(inside), dtype=bool)
+
+        for dy in (-1, 0, 1):
+            row = cy + dy
+            rowOk = (row >= 0) & (row < self.numRows)
+            row = np.clip(row, 0, self.numRows - 1)
+            start = self._rowStarts[row] + self._offsets[row, col0]
+            end = np.where(rowOk, self._rowStarts[row] + self._offsets[row, col1 + 1], start)
+            counts = end - start
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            if self.stats is not None:
+                self.stats.numGridPointsCompared += total
+                for dx in (-1, 0, 1): # the non-empty cells of this row of the neighbourhoods
+                    col = np.clip(cx + dx, 0, self.numCols - 1)
+                    colOk = rowOk & (cx + dx >= col0) & (cx + dx <= col1)
+                    self.stats.numGridCellVisits += int(np.count_nonzero(colOk & (self._offsets[row, col + 1] > self._offsets[row, col])))
+
+            # ---- flatten all (query, sample) pairs of this row of the neighbourhood
+            owner = np.repeat(np.arange(len(inside)), counts)
+            idxSample = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(start, counts)
+            d = inside[owner] - self._coords[idxSample]
+            hit = self._nearerThan(d[:, 0], d[:, 1], minDistance)
+            tooNear |= np.bincount(owner[hit], minlength=len(inside)) > 0
+
+        valid[idxInside[tooNear]] = False
+        return valid
@@ -0,0 +1,51 @@
+from typing import Callable, Union
+
+import numpy as np
+
+from Vector import Vector
+
+
+class BatchFlowField:
+    """
+    wraps a vectorized ("batch") flow field function so it can be passed to StreamlineGenerator instead of a
+    plain flowFieldFunction.
+
+    the batch contract:
+        batchFunction(coords: np.ndarray) -> np.ndarray
+        coords is an array of shape (N, 2) with x and y of N points, the result is an array of shape (N, 2) with the
+        velocities at these points. Points where the field is not defined get NaN velocities.
+
+    example:
+        BatchFlowField(lambda c: np.stack([np.sin(c[:, 1]), np.cos(c[:, 0])], axis=1))
+    """
+
+    def __init__(self, batchFunction: Callable):
+        self.batchFunction: Callable = batchFunction
+
+    def __call__(self, coords: Vector) -> Union[Vector, None]:
+        """
+        the single point path, a BatchFlowField can be used everywhere a flowFieldFunction is expected
+        """
+        velocity = self.evaluateBatch(np.array([[coords.x, coords.y]], dtype=np.float64))[0]
+        return Vector(float(velocity[0]), float(velocity[1]))
+
+    def evaluateBatch(self, coords: np.ndarray) -> np.ndarray:
+        return np.asarray(self.batchFunction(coords), dtype=np.float64).reshape(-1, 2)
+
+
+def evaluateFieldBatch(field: Callable, coords: np.ndarray) -> np.ndarray:
+    """
+    evaluates any flow field at an array of points of shape (N, 2), returns the velocities as array of shape (N, 2)
+    uses the batch path if the field has one (BatchFlowField and the other field classes), otherwise calls the
+    field once per point. NaN velocities mark points where the field is not defined.
+    """
+    if hasattr(field, 'evaluateBatch'):
+        return field.evaluateBatch(coords)
+
+    velocities = np.full((len(coords), 2), np.nan, dtype=np.float64)
+    for idx, (x, y) in enumerate(coords):
+        velocity = field(Vector(float(x), float(y)))
+        if velocity is not None:
+            velocities[idx] = (velocity.x, velocity.y)
+
+    return velocities
@@ -0,0 +1,100 @@
+import csv
+import json
+import os
+from typing import List
+
+from BoundingBox import BoundingBox
+from FieldSpec import FieldSpec
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+class BatchJob:
+    """
+    one configuration to render by BatchJobRunner: field, bbox, seed point, dSep / dTest / stepSize and the output file.
+    Picklable, the field is a FieldSpec. seedPoint None: see fromDict().
+
+    the output format depends on the extension of the output file:
+        .svg  monochrome polylines (SvgWriter), written while the streamlines are generated
+        .png  RasterRenderer, the image size is the size of the bbox
+        .npz  the arrays of the StreamlineCollection (coords, offsets, directions, speeds)
+    simplifyTolerance: if set, the streamlines of the .svg and .npz output are simplified (Douglas-Peucker, see
+                       simplify.py), no point is moved by more than it
+    """
+
+    OUTPUT_FORMATS = ('.svg', '.png', '.npz')
+
+    def __init__(self, jobId: str, field: FieldSpec, bbox: BoundingBox, seedPoint: Vector, output: str, dSep: float = None,
+                 dTest: float = None, stepSize: float = StreamlineGenerator.DEFAULT_TIME_STEP, simplifyTolerance: float = None):
+        if os.path.splitext(output)[1] not in self.OUTPUT_FORMATS:
+            raise Exception(f'job {jobId}: unknown output format of {output}, expected one of {self.OUTPUT_FORMATS}')
+
+        self.jobId: str = jobId
+        self.field: FieldSpec = field
+        self.bbox: BoundingBox = bbox
+        self.seedPoint: Vector = seedPoint
+        self.output: str = output
+        self.dSep: float = dSep
+        self.dTest: float = dTest
+        self.stepSize: float = stepSize
+        self.simplifyTolerance: float = simplifyTolerance
+
+    @classmethod
+    def fromDict(cls, job: dict, outDir: str = '.') -> "BatchJob":
+        """
+        a job of a manifest:
+            {"id": "frame-0001", "field": "demo:exampleFlowFieldFunction", "fieldParams": {}, "bbox": [x, y, width, height],
+             "seed": [x, y], "dSep": 10, "dTest": 2, "stepSize": 1.0, "simplify": 0.05, "output": "frame-0001.svg"}
+        field may be a dict as well (see FieldSpec.fromDict()). Without seed, the job starts at the center of the bbox or,
+        if the field has no direction there (a singularity), at the nearest point of a lattice with one (see
+        TiledStreamlineGenerator.seedCandidates()). output defaults to <id>.svg, it is relative to outDir.
+        """
+        jobId = str(job['id'])
+        if isinstance(job['field'], dict):
+            field = FieldSpec.fromDict(job['field'])
+        else:
+            field = FieldSpec(job['field'], job.get('fieldParams'))
+        x0, y0, width, height = (float(value) for value in job['bbox'])
+        seed = job.get('seed')
+        seedPoint = None if seed is None else Vector(float(seed[0]), float(seed[1]))
+
+        return cls(jobId, field, BoundingBox(x0, y0, width, height), seedPoint, os.path.join(outDir, job.get('output') or f'{jobId}.svg'),
+                   _optionalFloat(job.get('dSep')), _optionalFloat(job.get('dTest')),
+                   _optionalFloat(job.get('stepSize')) or StreamlineGenerator.DEFAULT_TIME_STEP, _optionalFloat(job.get('simplify')))
+
+    @classmethod
+    def fromCsvRow(cls, row: dict, outDir: str = '.') -> "BatchJob":
+        """
+        a row of a csv manifest, columns: id, field, fieldParams (json), x, y, width, height, seedX, seedY, dSep, dTest,
+        stepSize, simplify, output. Empty cells are not set.
+        """
+        job = {key: value for key, value in row.items() if value not in (None, '')}
+        job['bbox'] = [job['x'], job['y'], job['width'], job['height']]
+        if 'seedX' in job:
+            job['seed'] = [job['seedX'], job['seedY']]
+        if 'fieldParams' in job:
+            job['fieldParams'] = json.loads(job['fieldParams'])
+
+        return cls.fromDict(job, outDir)
+
+    def __repr__(self) -> str:
+        return f"BatchJob({self.jobId!r}, {self.field!r}, output={self.output!r})"
+
+
+def _optionalFloat(value) -> float:
+    return None if value is None else float(value)
+
+
+def loadManifest(path: str, outDir: str = '.') -> List[BatchJob]:
+    """
+    reads the jobs of a manifest, a .json file (a list of jobs or {"jobs": [...]}) or a .csv file
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            return [BatchJob.fromCsvRow(row, outDir) for row in csv.DictReader(f)]
+
+    with open(path) as f:
+        manifest = json.load(f)
+    jobs = manifest['jobs'] if isinstance(manifest, dict) else manifest
+
+    return [BatchJob.fromDict(job, outDir) for job in jobs]
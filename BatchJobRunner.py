@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+runs many StreamlineGenerator configurations (BatchJob) in a process pool
+
+usage: python3 BatchJobRunner.py manifest.json [--out-dir out] [--workers 4] [--report report.json] [--stats]
+
+the manifest is a .json file (a list of jobs, see BatchJob.fromDict()) or a .csv file (see BatchJob.fromCsvRow()).
+Each job writes its own output file. The report lists per job: ok, elapsed (seconds), number of streamlines and
+points, and the error (traceback) of failed jobs. With --stats also the counters and timers of the generator
+(see GeneratorStats).
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+import numpy as np
+
+from BatchJob import BatchJob, loadManifest
+from RasterRenderer import RasterRenderer
+from StreamlineGenerator import StreamlineGenerator
+from SvgWriter import SvgWriter
+from TiledStreamlineGenerator import seedCandidates
+from simplify import simplifyPolyline
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchJobRunner:
+    """
+    runs BatchJobs on a concurrent.futures.ProcessPoolExecutor, a failing job does not stop the others
+    """
+
+    def __init__(self, maxWorkers: int = None, collectStats: bool = False):
+        """
+        maxWorkers: number of processes, default: number of cpus
+        collectStats: if True, the results contain the GeneratorStats of the jobs (as dict)
+        """
+        self.maxWorkers: int = maxWorkers
+        self.collectStats: bool = collectStats
+
+    def run(self, jobs: List[BatchJob]) -> List[dict]:
+        """
+        returns the results (see runJob()) in the order of the jobs, each result is logged when its job is done
+        """
+        results = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=self.maxWorkers) as executor:
+            futures = {executor.submit(runJob, job, self.collectStats): idxJob for idxJob, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if result['ok']:
+                    logger.info("%s: %d streamlines in %.2f s -> %s", result['id'], result['numStreamlines'], result['elapsed'], result['output'])
+                else:
+                    logger.error("%s: FAILED after %.2f s\n%s", result['id'], result['elapsed'], result['error'])
+
+        return results
+
+
+def runJob(job: BatchJob, collectStats: bool = False) -> dict:
+    """
+    runs a single job (in a worker process) and writes its output file
+    returns {id, output, ok, elapsed, numStreamlines, numPoints, error, stats}, stats is None if not collectStats
+    """
+    result = {'id': job.jobId, 'output': job.output, 'ok': False, 'elapsed': None, 'numStreamlines': 0, 'numPoints': 0, 'error': None, 'stats': None}
+    t0 = time.perf_counter()
+    try:
+        outDir = os.path.dirname(job.output)
+        if outDir:
+            os.makedirs(outDir, exist_ok=True)
+
+        generator = StreamlineGenerator(job.field.resolve(), job.dSep, job.dTest, job.stepSize, collectStats=collectStats)
+        seedPoint = job.seedPoint
+        if seedPoint is None:
+            seedPoint = next((pt for pt in seedCandidates(job.bbox) if generator.vectorFieldNormalized(pt) is not None), None)
+            if seedPoint is None:
+                raise Exception('no seed point with a defined direction in the bbox')
+        extension = os.path.splitext(job.output)[1]
+        if extension == '.svg':
+            # ---- streamed, each streamline is written as soon as it is generated
+            with SvgWriter(job.output, job.bbox) as writer:
+                for idxStreamline, streamline, stats in generator.iterStreamlines(job.bbox, seedPoint):
+                    if idxStreamline == 0:
+                        _assertFirstStreamline(streamline, seedPoint)
+                    writer.addPolyline(streamline if job.simplifyTolerance is None else simplifyPolyline(streamline, job.simplifyTolerance))
+                    result['numStreamlines'] = stats['numStreamlines']
+                    result['numPoints'] = stats['numSamplePoints']
+        else:
+            streamlines = generator.buildStreamlines(job.bbox, seedPoint, compact=True)
+            _assertFirstStreamline(streamlines[0], seedPoint)
+            result['numStreamlines'] = len(streamlines)
+            result['numPoints'] = streamlines.numPoints()
+            if extension == '.png':
+                renderer = RasterRenderer(job.bbox, max(1, round(job.bbox.width)), max(1, round(job.bbox.height)))
+                for streamline in streamlines:
+                    renderer.addStreamline(streamline)
+                renderer.savePng(job.output)
+            else:
+                if job.simplifyTolerance is not None:
+                    streamlines = streamlines.simplified(job.simplifyTolerance)
+                np.savez(job.output, **streamlines.toArrays())
+        if collectStats:
+            result['stats'] = generator.getStats().toDict()
+        result['ok'] = True
+    except Exception:
+        result['error'] = traceback.format_exc()
+
+    result['elapsed'] = time.perf_counter() - t0
+    return result
+
+
+def _assertFirstStreamline(streamline: np.ndarray, seedPoint):
+    """
+    internal helper, the first streamline is a single point if the field has no direction at the seed point, the job
+    failed then (no other streamline is started)
+    """
+    if len(streamline) < 2:
+        raise Exception(f'the first streamline is a single point, the field has no direction at the seed point {seedPoint.asTuple()}')
+
+
+def main(argv: List[str] = None) -> int:
+    """
+    the command line interface, returns the exit code (1 if a job failed)
+    """
+    parser = argparse.ArgumentParser(description='render many streamline configurations (a json or csv manifest) in a process pool')
+    parser.add_argument('manifest', help='.json or .csv file with the jobs')
+    parser.add_argument('--out-dir', default='.', help='directory of the output files (default: .)')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes (default: number of cpus)')
+    parser.add_argument('--report', default=None, help='json file for the per-job results (default: <out-dir>/report.json)')
+    parser.add_argument('--stats', action='store_true', help='add the counters and timers of the generator to the report')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    jobs = loadManifest(args.manifest, args.out_dir)
+    t0 = time.perf_counter()
+    results = BatchJobRunner(args.workers, args.stats).run(jobs)
+    numFailed = sum(1 for result in results if not result['ok'])
+    logger.info("%d jobs done in %.2f s, %d failed", len(results), time.perf_counter() - t0, numFailed)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    with open(args.report or os.path.join(args.out_dir, 'report.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+
+    return 1 if numFailed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
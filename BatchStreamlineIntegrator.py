@@ -0,0 +1,165 @@
+import math
+from typing import List, Tuple, Union
+import typing
+
+import numpy as np
+
+from GeneratorStats import GeneratorStats
+from LookupGrid import LookupGrid
+from OccupancyGrid import OccupancyGrid
+from StreamlineIntegrator import StreamlineIntegrator
+from Vector import Vector
+from rk4 import rk4Batch
+
+
+class BatchStreamlineIntegrator:
+    """
+    for "integrating" (building) many independent streamlines at once
+
+    every seed point is a "lane". All lanes are advanced in lock-step, so each RK4 stage is a single call of the
+    batched field function for all active lanes. A lane stops (per-lane termination mask) when it hits a singularity,
+    when it runs into itself or when the new point is out of bounds or too near (dTest) to the streamlines in the grid.
+
+    The lanes do not see each other, and the grid is not modified: the caller commits the lanes to the grid in order
+    and truncates each one at the first point which became invalid by the lanes committed before it
+    (see StreamlineGenerator._commitLanes).
+    """
+
+    # ---- termination reasons
+    SINGULARITY = 1
+    SELF_HIT = 2
+    INVALID = 3 # out of bounds or too near to another streamline
+
+    def __init__(self,
+                 vectorFieldNormalizedBatch: typing.Callable,
+                 grid: LookupGrid,
+                 stepSize: float,
+                 dTest: float,
+                 sampleVectorFieldBatch: typing.Callable = None # optional, returns (velocities, normalized velocities) at passed coords
+    ):
+        """
+        if sampleVectorFieldBatch is passed, the (raw) velocities at the points of the streamlines are recorded too,
+        like in StreamlineIntegrator
+        """
+        self.vectorFieldNormalizedBatch: typing.Callable = vectorFieldNormalizedBatch
+        self.sampleVectorFieldBatch: typing.Callable = sampleVectorFieldBatch
+        self.grid: LookupGrid = grid
+        self.stepSize: float = stepSize
+        self.dTest: float = dTest
+        self.stats: GeneratorStats = None # optional, counts the steps and why lanes end (set by StreamlineGenerator)
+
+        # ---- results of the last buildStreamlines() call, one entry per lane
+        self.forwardPoints: List[List[Vector]] = None # points grown forward, without the seed point
+        self.backwardPoints: List[List[Vector]] = None # points grown backward, nearest to the seed point first
+        self.forwardStopReasons: List[int] = None
+        self.backwardStopReasons: List[int] = None
+        # (velocity, direction) at the seed point and at the forwardPoints / backwardPoints, see StreamlineIntegrator
+        self.seedSamples: List[Tuple[Vector, Vector]] = None
+        self.forwardSamples: List[List[Tuple[Vector, Vector]]] = None
+        self.backwardSamples: List[List[Tuple[Vector, Vector]]] = None
+
+    def buildStreamlines(self, seedPoints: List[Vector]) -> List[List[Vector]]:
+        """
+        the MAIN function, returns one streamline per seed point
+        """
+        numLanes = len(seedPoints)
+        occupancyGrids = [OccupancyGrid(abs(self.stepSize)) for _ in range(numLanes)]
+        for occupancyGrid, seedPoint in zip(occupancyGrids, seedPoints):
+            occupancyGrid.addSamplePoint(seedPoint)
+
+        pos = np.array([pt.asTuple() for pt in seedPoints], dtype=np.float64).reshape(-1, 2)
+        seedVelocities, seedDirections = self._sample(pos)
+        self.seedSamples = [(_toVector(velocity), _toVector(direction)) for velocity, direction in zip(seedVelocities, seedDirections)]
+
+        self.forwardPoints, self.forwardSamples, self.forwardStopReasons = \
+            self._growLanes(pos, self.stepSize, occupancyGrids, seedDirections)
+        self.backwardPoints, self.backwardSamples, self.backwardStopReasons = \
+            self._growLanes(pos, -self.stepSize, occupancyGrids, seedDirections)
+
+        return [self.backwardPoints[idxLane][::-1] + [seedPoints[idxLane]] + self.forwardPoints[idxLane]
+                for idxLane in range(numLanes)]
+
+    def streamlineSamples(self, idxLane: int) -> List[Tuple[Vector, Vector]]:
+        """
+        (velocity, direction) at the points of the streamline of a lane, in the same order as its points
+        """
+        return self.backwardSamples[idxLane][::-1] + [self.seedSamples[idxLane]] + self.forwardSamples[idxLane]
+
+    def _sample(self, pos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        private helper, returns (velocities, directions) at pos
+        """
+        if self.sampleVectorFieldBatch is not None:
+            return self.sampleVectorFieldBatch(pos)
+
+        return np.full(pos.shape, np.nan), self.vectorFieldNormalizedBatch(pos)
+
+    def _growLanes(self, seedPos: np.ndarray, stepSize: float, occupancyGrids: List[OccupancyGrid], seedDirections: np.ndarray):
+        """
+        private helper, grows all lanes into one direction until every lane is stopped
+        """
+        numLanes = len(seedPos)
+        points: List[List[Vector]] = [[] for _ in range(numLanes)]
+        samples: List[List[Tuple[Vector, Vector]]] = [[] for _ in range(numLanes)]
+        stopReasons: List[int] = [None] * numLanes
+        selfHitDistance = abs(stepSize) * StreamlineIntegrator.STEP_SIZE_FACTOR_TERMINATION_CONDITION
+
+        pos = seedPos.copy()
+        idxActive = np.arange(numLanes)
+        directions = seedDirections # the seed points were already sampled
+        while len(idxActive) > 0:
+            velocity = rk4Batch(pos[idxActive], stepSize, self.vectorFieldNormalizedBatch, directions)
+            # Hit the singularity (not defined or zero length)
+            singular = np.isnan(velocity).any(axis=1) | (np.abs(velocity) < 1e-8).all(axis=1)
+            candidates = pos[idxActive] + velocity
+            valid = np.zeros(len(idxActive), dtype=bool)
+            valid[~singular] = self.grid.arePointsValid(candidates[~singular], self.dTest)
+
+            keep = []
+            for j, idxLane in enumerate(idxActive):
+                if singular[j]:
+                    stopReasons[idxLane] = self.SINGULARITY
+                    if self.stats is not None:
+                        self.stats.reject(GeneratorStats.REJECTED_SINGULARITY)
+                    continue
+
+                candidate = Vector(float(candidates[j, 0]), float(candidates[j, 1]))
+                if occupancyGrids[idxLane].hasPointWithin(candidate, selfHitDistance):
+                    stopReasons[idxLane] = self.SELF_HIT
+                    if self.stats is not None:
+                        self.stats.reject(GeneratorStats.REJECTED_SELF_HIT)
+                    continue
+
+                if not valid[j]:
+                    stopReasons[idxLane] = self.INVALID
+                    if self.stats is not None:
+                        self.stats.reject(GeneratorStats.REJECTED_OUT_OF_BOUNDS if self.grid._isOutside(candidate) else GeneratorStats.REJECTED_D_TEST)
+                    continue
+
+                points[idxLane].append(candidate)
+                occupancyGrids[idxLane].addSamplePoint(candidate)
+                keep.append(j)
+
+            idxActive = idxActive[keep]
+            pos[idxActive] = candidates[keep]
+            if self.stats is not None:
+                self.stats.numSteps += len(keep)
+            if len(idxActive) == 0:
+                break
+
+            # ---- sample the new points, the directions are the first RK4 stage of the next step
+            velocities, directions = self._sample(pos[idxActive])
+            for j, idxLane in enumerate(idxActive):
+                samples[idxLane].append((_toVector(velocities[j]), _toVector(directions[j])))
+
+        return points, samples, stopReasons
+
+
+def _toVector(row: np.ndarray) -> Union[Vector, None]:
+    """
+    internal helper, a row of an array of shape (N, 2) as Vector, None if NaN
+    """
+    if math.isnan(row[0]) or math.isnan(row[1]):
+        return None
+
+    return Vector(float(row[0]), float(row[1]))
@@ -0,0 +1,99 @@
+import math
+from collections import OrderedDict
+from typing import Callable, Tuple, Union
+
+import numpy as np
+
+from BatchFlowField import evaluateFieldBatch
+from Vector import Vector
+
+
+class CachedFlowField:
+    """
+    opt-in cache for expensive flow fields (e.g. reading from a database backed model or a large interpolator), pass it
+    to StreamlineGenerator instead of the field: StreamlineGenerator(CachedFlowField(myField, 0.01), ..)
+
+    The coords are quantized to a grid of the passed resolution, the field is evaluated at the grid point (so a cached
+    value does not depend on which nearby coords were evaluated first). The values are kept in a LRU of at most
+    maxSize entries. Both paths of the generator go through the cache: the single point path (__call__, for the
+    normalized velocities) and the batch path (evaluateBatch(), e.g. for the speeds), misses of a batch are evaluated
+    in one call of the batch path of the field (if it has one, see BatchFlowField).
+
+    Note that the streamlines differ from the ones of the uncached field, as the field is evaluated at the quantized
+    coords. Choose a resolution far below the step size.
+    """
+
+    def __init__(self, field: Callable, resolution: float = 1e-3, maxSize: int = 1 << 20):
+        self.field: Callable = field
+        self.resolution: float = resolution
+        self.maxSize: int = maxSize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._cache: OrderedDict = OrderedDict() # (ix, iy) -> (vx, vy), NaN where not defined
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __call__(self, coords: Vector) -> Union[Vector, None]:
+        key = (round(coords.x / self.resolution), round(coords.y / self.resolution))
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        else:
+            self.misses += 1
+            velocity = self.field(Vector(key[0] * self.resolution, key[1] * self.resolution))
+            value = (math.nan, math.nan) if velocity is None else (velocity.x, velocity.y)
+            self._store(key, value)
+
+        if math.isnan(value[0]) or math.isnan(value[1]):
+            return None
+
+        return Vector(value[0], value[1])
+
+    def evaluateBatch(self, coords: np.ndarray) -> np.ndarray:
+        """
+        coords is an array of shape (N, 2), returns the velocities as array of shape (N, 2), NaN where not defined
+        """
+        keys = np.rint(np.asarray(coords, dtype=np.float64).reshape(-1, 2) / self.resolution).astype(np.int64)
+        velocities = np.empty((len(keys), 2), dtype=np.float64)
+        missing = {} # key -> indexes of the rows
+        for idxRow, key in enumerate(map(tuple, keys.tolist())):
+            value = self._cache.get(key)
+            if value is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                velocities[idxRow] = value
+            else:
+                missing.setdefault(key, []).append(idxRow)
+
+        if missing:
+            self.misses += len(missing)
+            self.hits += sum(len(idxRows) - 1 for idxRows in missing.values()) # duplicates within the batch
+            missingKeys = list(missing)
+            missingVelocities = evaluateFieldBatch(self.field, np.array(missingKeys, dtype=np.float64) * self.resolution)
+            for key, velocity in zip(missingKeys, missingVelocities.tolist()):
+                velocities[missing[key]] = velocity
+                self._store(key, (velocity[0], velocity[1]))
+
+        return velocities
+
+    def hitRate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """
+        empties the cache and resets the counters, e.g. after the field changed
+        """
+        self._cache.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, key: Tuple[int, int], value: Tuple[float, float]):
+        """
+        private helper, adds a value, the least recently used one is evicted if the cache is full
+        """
+        self._cache[key] = value
+        if len(self._cache) > self.maxSize:
+            self._cache.popitem(last=False)
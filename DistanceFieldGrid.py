@@ -0,0 +1,178 @@
+import math
+from typing import List
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from LookupGridBase import LookupGridBase
+from Vector import Vector
+
+
+class DistanceFieldGrid(LookupGridBase):
+    """
+    approximate alternative backend for LookupGrid (same addStreamline() / isPointValid() / arePointsValid() API)
+
+    instead of buckets of sample points it keeps a raster of the distance to the nearest sample point: each new sample
+    point stamps a disc of radius > dSep into the raster (the exact distances at the pixel centers, the minimum is
+    kept). A query interpolates (bilinear) the 4 pixels around the point, so its costs do not depend on how many sample
+    points are near the point or on the ratio of dTest and dSep.
+
+    The price is accuracy: the interpolated distance is not exact. Away from the sample points the distance is smooth
+    and the error is small (about resolution ** 2 / (8 * distance)), at dTest with the default resolution it is a few
+    hundredths of dTest. The interpolation overestimates the distance (the distance is convex), so by default a point
+    is valid if the interpolated distance is >= minDistance + resolution ** 2 / (8 * minDistance): no point nearer than
+    minDistance (dTest) is accepted, but some slightly farther are rejected. The queries at dSep are not shifted, the
+    seed point candidates are placed at exactly dSep and would all be rejected. With a tolerance a point is valid if
+    the interpolated distance is >= minDistance - tolerance instead, tolerance=0 accepts some points slightly nearer
+    than minDistance. A finer resolution means less error, but more memory ((width / resolution) *
+    (height / resolution) floats) and more pixels to stamp per sample point (about 3 * (dSep / resolution) ** 2).
+    See benchmarks/distanceFieldGrid.py for when it beats the exact grids.
+
+    usage: StreamlineGenerator(field, dSep, dTest, lookupGridClass=DistanceFieldGrid) or, with another resolution,
+           lookupGridClass=functools.partial(DistanceFieldGrid, resolution=0.5)
+    """
+
+    BATCHED_QUERIES = True
+    DEFAULT_RESOLUTION_FACTOR = 0.125 # resolution = dSep * DEFAULT_RESOLUTION_FACTOR
+    STAMP_CHUNK_SIZE = 1 << 20 # max. number of pixels stamped at once (memory of the temporary arrays)
+
+    def __init__(self, bbox: BoundingBox, dSep: float, resolution: float = None, tolerance: float = None):
+        """
+        resolution: size of the pixels, default: dSep * DEFAULT_RESOLUTION_FACTOR
+        tolerance: see above, > 0 accepts more points, < 0 fewer, default None: minDistance plus the interpolation error
+        """
+        super().__init__(bbox, dSep)
+        self.resolution: float = dSep * self.DEFAULT_RESOLUTION_FACTOR if resolution is None else resolution
+        self.tolerance: float = tolerance
+        self._maxErrorFactor: float = self.resolution * self.resolution / 8 # max. interpolation error * distance
+
+        # the raster: rasterCols x rasterRows pixels (numCols / numRows are the cells of size dSep, see LookupGridBase),
+        # pixel (col, row) has its center at topLeft + (col, row) * resolution
+        self.rasterCols: int = math.floor(bbox.width / self.resolution) + 2
+        self.rasterRows: int = math.floor(bbox.height / self.resolution) + 2
+        self._numSamplePoints: int = 0
+        self._x0: float = bbox.topLeft.x
+        self._y0: float = bbox.topLeft.y
+        self._invResolution: float = 1.0 / self.resolution
+        self._fxMax: float = (bbox.width - 1) * self._invResolution # the bounds of isPointValid(), in pixels
+        self._fyMax: float = (bbox.height - 1) * self._invResolution
+
+        # ---- the pixel offsets of a disc which contains all pixels within dSep + 2 * resolution of a point in the center
+        #      pixel, so the 4 pixels around a query point nearer than dSep to a sample point are all stamped by it
+        radius = math.ceil(dSep / self.resolution) + 3
+        offsetX, offsetY = np.meshgrid(np.arange(-radius, radius + 1), np.arange(-radius, radius + 1))
+        inDisc = offsetX * offsetX + offsetY * offsetY <= radius * radius
+        self._stencilX: np.ndarray = offsetX[inDisc].astype(np.int64)
+        self._stencilY: np.ndarray = offsetY[inDisc].astype(np.int64)
+
+        # the pixels which are not stamped are farther than dSep (finite, they are interpolated)
+        self._distances: np.ndarray = np.full(self.rasterRows * self.rasterCols, 2.0 * radius * self.resolution, dtype=np.float64) # row-major
+        self._distancesView: memoryview = memoryview(self._distances) # the same memory, faster single element reads
+
+    def numSamplePoints(self) -> int:
+        return self._numSamplePoints
+
+    def addSamplePoint(self, point: Vector):
+        self.addPoints(np.array([[point.x, point.y]], dtype=np.float64))
+
+    def addStreamline(self, streamline: List[Vector]):
+        self.addPoints(np.array([(pt.x, pt.y) for pt in streamline], dtype=np.float64).reshape(-1, 2))
+
+    def addPoints(self, points: np.ndarray):
+        """
+        bulk insertion of sample points, points is an array of shape (N, 2)
+        """
+        if len(points) == 0:
+            return
+        self._assertPointsInBounds(points)
+
+        chunkSize = max(1, self.STAMP_CHUNK_SIZE // len(self._stencilX))
+        for idxChunk in range(0, len(points), chunkSize):
+            self._stamp(points[idxChunk:idxChunk + chunkSize])
+        self._numSamplePoints += len(points)
+
+    def _stamp(self, points: np.ndarray):
+        """
+        internal helper, stamps the discs of the points into the raster
+        """
+        px = points[:, 0:1]
+        py = points[:, 1:2]
+        cols = np.rint((px - self.bbox.topLeft.x) / self.resolution).astype(np.int64) + self._stencilX
+        rows = np.rint((py - self.bbox.topLeft.y) / self.resolution).astype(np.int64) + self._stencilY
+        inside = (cols >= 0) & (cols < self.rasterCols) & (rows >= 0) & (rows < self.rasterRows)
+        dx = self.bbox.topLeft.x + cols * self.resolution - px
+        dy = self.bbox.topLeft.y + rows * self.resolution - py
+        distances = np.sqrt(dx * dx + dy * dy)
+        np.minimum.at(self._distances, (rows * self.rasterCols + cols)[inside], distances[inside])
+
+    def _assertMinDistance(self, minDistance: float):
+        """
+        internal helper, the raster only holds the distances up to dSep
+        """
+        if minDistance > self.dSep:
+            raise Exception(f'minDistance {minDistance} is greater than dSep {self.dSep}')
+
+    def _threshold(self, minDistance: float) -> float:
+        """
+        internal helper, the min. interpolated distance of a valid point (see above)
+        """
+        if self.tolerance is not None:
+            return minDistance - self.tolerance
+        return minDistance + self._maxErrorFactor / minDistance if 0 < minDistance < self.dSep else minDistance
+
+    def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+        """
+        1st) checks if pt is inside ouf bounds of the grid
+        2nd) returns True if the distance to the nearest sample point is >= minDistance (approximately, see above)
+        """
+        if self.stats is not None:
+            self.stats.numGridQueries += 1
+            self.stats.numGridCellVisits += 1
+        # ---- inlined _isOutside() and _assertMinDistance(), this is the hot path
+        fx = (pt.x - self._x0) * self._invResolution
+        fy = (pt.y - self._y0) * self._invResolution
+        if fx < 0 or fx > self._fxMax or fy < 0 or fy > self._fyMax:
+            return False
+        if minDistance > self.dSep:
+            self._assertMinDistance(minDistance)
+
+        col = int(fx)
+        row = int(fy)
+        tx = fx - col
+        ty = fy - row
+        idx = row * self.rasterCols + col
+        d = self._distancesView
+        distance = (d[idx] * (1 - tx) + d[idx + 1] * tx) * (1 - ty) + \
+                   (d[idx + self.rasterCols] * (1 - tx) + d[idx + self.rasterCols + 1] * tx) * ty
+
+        # ---- inlined _threshold()
+        if self.tolerance is not None:
+            return bool(distance >= minDistance - self.tolerance)
+        if 0 < minDistance < self.dSep:
+            return bool(distance >= minDistance + self._maxErrorFactor / minDistance)
+        return bool(distance >= minDistance)
+
+    def arePointsValid(self, points: np.ndarray, minDistance: float) -> np.ndarray:
+        """
+        batched version of isPointValid() for an array of shape (N, 2), returns a bool array of shape (N,)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.stats is not None:
+            self.stats.numGridQueries += len(points)
+            self.stats.numGridCellVisits += len(points)
+        self._assertMinDistance(minDistance)
+        valid = ~self._outsideMask(points)
+        inside = points[valid]
+        fx = (inside[:, 0] - self.bbox.topLeft.x) / self.resolution
+        fy = (inside[:, 1] - self.bbox.topLeft.y) / self.resolution
+        cols = fx.astype(np.int64)
+        rows = fy.astype(np.int64)
+        tx = fx - cols
+        ty = fy - rows
+        idx = rows * self.rasterCols + cols
+        d = self._distances
+        distances = (d[idx] * (1 - tx) + d[idx + 1] * tx) * (1 - ty) + \
+                    (d[idx + self.rasterCols] * (1 - tx) + d[idx + self.rasterCols + 1] * tx) * ty
+        valid[valid] = distances >= self._threshold(minDistance)
+
+        return valid
@@ -0,0 +1,160 @@
+from typing import Callable, List, Union
+
+from Vector import Vector
+
+
+class DormandPrinceIntegrator:
+    """
+    adaptive integrator for StreamlineIntegrator (see Rk4Integrator for the interface), an embedded RK45 scheme
+    (Dormand-Prince 5(4)).
+
+    The internal steps are as long as the local error (difference of the 5th and the 4th order solution) allows,
+    up to maxStepFactor * abs(stepSize): long in nearly straight flow, short in curly regions. The output is resampled:
+    step() returns the points at a distance of abs(stepSize) along the path (the 4th order dense output of
+    Dormand-Prince interpolates within the internal steps without extra field evaluations), so the grid gets the same
+    dense points as with the fixed step integrator.
+
+    As the field is normalized, the parameter of the integration is the arc length.
+    """
+
+    # ---- the Butcher tableau of Dormand-Prince 5(4) (without the nodes c, the normalized field does not depend on time)
+    A = [
+        [],
+        [1 / 5],
+        [3 / 40, 9 / 40],
+        [44 / 45, -56 / 15, 32 / 9],
+        [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+        [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+        [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84], # = B5, the 7th stage is the velocity at the new point (FSAL)
+    ]
+    B5 = [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0]
+    B4 = [5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40]
+    # the coefficients of the dense output (continuous extension, see Hairer et al., "Solving ODEs I", dopri5)
+    D = [-12715105075 / 11282082432, 0.0, 87487479700 / 32700410799, -10690763975 / 1880347072,
+         701980252875 / 199316789632, -1453857185 / 822651844, 69997945 / 29380423]
+
+    SAFETY_FACTOR = 0.9
+    MIN_STEP_CHANGE = 0.2
+    MAX_STEP_CHANGE = 5.0
+
+    def __init__(self, tolerance: float = 1e-4, maxStepFactor: float = 16.0, minStepFactor: float = 1 / 16):
+        """
+        tolerance: max. local error per internal step (in units of length)
+        maxStepFactor, minStepFactor: max. / min. length of an internal step, in multiples of abs(stepSize)
+        """
+        self.tolerance: float = tolerance
+        self.maxStepFactor: float = maxStepFactor
+        self.minStepFactor: float = minStepFactor
+        self.numSteps: int = 0 # accepted internal steps (statistics)
+        self.numRejectedSteps: int = 0 # statistics
+        # ---- the current internal step: from y0 to y1 (the velocity at y1 is f1), length h (negative for BACKWARD)
+        self._y0: Vector = None
+        self._y1: Vector = None
+        self._f1: Vector = None
+        self._h: float = 0.0
+        self._dense: List[Vector] = None # the coefficients of the dense output of the current step
+        self._t: float = 0.0 # parameter of the last output point in the current step, 0 .. h
+        self._nextH: float = 0.0 # the (signed) length of the next internal step
+
+    def begin(self, start: Vector, stepSize: float, getVelocity: Callable):
+        self._y0 = self._y1 = start
+        self._f1 = None
+        self._h = 0.0
+        self._t = 0.0
+        self._nextH = stepSize
+
+    def step(self, pos: Vector, stepSize: float, getVelocity: Callable, k1: Vector) -> Union[Vector, None]:
+        if self._f1 is None:
+            self._f1 = k1 # velocity at the start point
+
+        # ---- take internal steps until the current one covers the next output point
+        t = self._t + stepSize
+        while abs(t) > abs(self._h):
+            t -= self._h
+            if not self._advance(stepSize, getVelocity):
+                return None
+
+        self._t = t
+
+        return self._interpolate(t) - pos
+
+    def _advance(self, stepSize: float, getVelocity: Callable) -> bool:
+        """
+        private helper, one accepted internal step from y1, False if the field is not defined
+        """
+        maxH = abs(stepSize) * self.maxStepFactor
+        minH = abs(stepSize) * self.minStepFactor
+        h = self._nextH
+        while True:
+            k = self._stages(self._y1, self._f1, h, getVelocity)
+            if k is None:
+                if abs(h) <= minH:
+                    return False
+                h *= 0.5 # maybe the step just went too far, e.g. out of the domain
+                continue
+
+            y5 = self._y1 + _weightedSum(k, self.B5, h)
+            y4 = self._y1 + _weightedSum(k, self.B4, h)
+            error = (y5 - y4).length()
+            factor = self.MAX_STEP_CHANGE if error == 0 else \
+                min(self.MAX_STEP_CHANGE, max(self.MIN_STEP_CHANGE, self.SAFETY_FACTOR * (self.tolerance / error) ** 0.2))
+            newH = _clamp(h * factor, minH, maxH)
+            if error <= self.tolerance or abs(h) <= minH:
+                break
+
+            self.numRejectedSteps += 1
+            h = newH
+
+        self.numSteps += 1
+        yDiff = y5 - self._y1
+        bspl = k[0] * h - yDiff
+        self._dense = [yDiff, bspl, yDiff - k[6] * h - bspl, _weightedSum(k, self.D, h)]
+        self._y0 = self._y1
+        self._y1, self._f1 = y5, k[6]
+        self._h = h
+        self._nextH = newH
+
+        return True
+
+    def _stages(self, y: Vector, f: Vector, h: float, getVelocity: Callable) -> Union[List[Vector], None]:
+        """
+        private helper, the 7 stages of a step of length h from y, f is the velocity at y (first stage)
+        """
+        k = [f]
+        for idxStage in range(1, 7):
+            kNext = getVelocity(y + _weightedSum(k, self.A[idxStage], h))
+            if not kNext:
+                return None
+            k.append(kNext)
+
+        return k
+
+    def _interpolate(self, t: float) -> Vector:
+        """
+        private helper, the point at parameter t (0 .. h) of the current internal step (dense output)
+        """
+        theta = t / self._h
+        theta1 = 1.0 - theta
+        yDiff, bspl, c4, c5 = self._dense
+
+        return self._y0 + (yDiff + (bspl + (c4 + c5 * theta1) * theta) * theta1) * theta
+
+
+def _weightedSum(k: List[Vector], weights: List[float], h: float) -> Vector:
+    """
+    internal helper, h * sum(weights[i] * k[i])
+    """
+    x = 0.0
+    y = 0.0
+    for ki, weight in zip(k, weights):
+        x += ki.x * weight
+        y += ki.y * weight
+
+    return Vector(x * h, y * h)
+
+
+def _clamp(h: float, minH: float, maxH: float) -> float:
+    """
+    internal helper, limits the length of h, keeps the sign
+    """
+    return max(minH, min(maxH, abs(h))) * (1 if h > 0 else -1)
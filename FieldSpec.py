@@ -0,0 +1,56 @@
+import functools
+import importlib
+from typing import Callable
+
+
+class FieldSpec:
+    """
+    a picklable description of a flow field: "module:function" plus keyword parameters, resolved where it is used
+    (e.g. in a worker process of BatchJobRunner), so lambdas and closures do not have to be pickled.
+
+        FieldSpec('demo:exampleFlowFieldFunction')
+        FieldSpec('myFields:vortex', {'strength': 2.0})                 -> vortex(coords, strength=2.0)
+        FieldSpec('myFields:loadFrame', {'path': 'frame-0042.npy'}, factory=True)
+                                                                         -> the field returned by loadFrame(path=..)
+    """
+
+    def __init__(self, target: str, params: dict = None, factory: bool = False):
+        """
+        target: "module:attribute", the attribute may be a dotted path (e.g. a classmethod)
+        factory: if True, target(**params) returns the field, otherwise the field is target(coords, **params)
+        """
+        if ':' not in target:
+            raise Exception(f'field spec "{target}" is not of the form "module:function"')
+
+        self.target: str = target
+        self.params: dict = {} if params is None else params
+        self.factory: bool = factory
+
+    @classmethod
+    def fromDict(cls, spec: dict) -> "FieldSpec":
+        """
+        {"target": "module:function", "params": {...}, "factory": false}
+        """
+        return cls(spec['target'], spec.get('params'), spec.get('factory', False))
+
+    def toDict(self) -> dict:
+        return {'target': self.target, 'params': self.params, 'factory': self.factory}
+
+    def resolve(self) -> Callable:
+        """
+        imports the module and returns the field
+        """
+        moduleName, attributePath = self.target.split(':', 1)
+        target = importlib.import_module(moduleName)
+        for attribute in attributePath.split('.'):
+            target = getattr(target, attribute)
+
+        if self.factory:
+            return target(**self.params)
+        if self.params:
+            return functools.partial(target, **self.params)
+
+        return target
+
+    def __repr__(self) -> str:
+        return f"FieldSpec({self.target!r}, {self.params!r})"
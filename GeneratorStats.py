@@ -0,0 +1,80 @@
+from typing import Dict
+
+
+class GeneratorStats:
+    """
+    counters and timers of a StreamlineGenerator build, collected if the generator was created with collectStats=True
+    (see StreamlineGenerator.getStats()). Without it no stats object exists and the hot paths only check for None.
+
+    counters:
+        numFieldCalls               evaluations of the flow field, single point path
+        numFieldBatchCalls          calls of the batch path, numFieldBatchPoints points evaluated by them
+        numGridQueries              points checked by the lookup grid (isPointValid() / arePointsValid())
+        numGridCellVisits           non-empty cells of the neighbourhoods of these points
+        numGridPointsCompared       sample points whose distance was computed
+        numSteps                    integration steps which added a point to a streamline
+        rejections                  integration steps which ended a streamline, by reason (REJECTED_*)
+                                    (with seedBatchSize > 1: steps and rejections of the lanes, before they are truncated)
+        numSeedCandidates           seed point candidates checked, numSeedCandidatesRejected of them were too near (dSep)
+                                    to a streamline or out of bounds
+
+    times (seconds, see PHASE_*):
+        integration                 building the streamlines, including the field and the dTest checks
+        seedSearch                  searching the seed points, including the dSep checks
+        gridInsertion               adding the streamlines to the lookup grid
+        field                       inside the flow field (part of integration)
+    """
+
+    # ---- rejection reasons (keys of rejections)
+    REJECTED_SINGULARITY = 'singularity' # the field is not defined or zero
+    REJECTED_D_TEST = 'dTest' # too near to another streamline
+    REJECTED_SELF_HIT = 'selfHit' # ran into itself
+    REJECTED_OUT_OF_BOUNDS = 'outOfBounds'
+
+    # ---- phases (keys of times)
+    PHASE_INTEGRATION = 'integration'
+    PHASE_SEED_SEARCH = 'seedSearch'
+    PHASE_GRID_INSERTION = 'gridInsertion'
+    PHASE_FIELD = 'field'
+
+    def __init__(self):
+        self.numFieldCalls: int = 0
+        self.numFieldBatchCalls: int = 0
+        self.numFieldBatchPoints: int = 0
+        self.numGridQueries: int = 0
+        self.numGridCellVisits: int = 0
+        self.numGridPointsCompared: int = 0
+        self.numSteps: int = 0
+        self.numSeedCandidates: int = 0
+        self.numSeedCandidatesRejected: int = 0
+        self.rejections: Dict[str, int] = {reason: 0 for reason in (self.REJECTED_SINGULARITY, self.REJECTED_D_TEST,
+                                                                     self.REJECTED_SELF_HIT, self.REJECTED_OUT_OF_BOUNDS)}
+        self.times: Dict[str, float] = {phase: 0.0 for phase in (self.PHASE_INTEGRATION, self.PHASE_SEED_SEARCH,
+                                                                  self.PHASE_GRID_INSERTION, self.PHASE_FIELD)}
+
+    def reject(self, reason: str, count: int = 1):
+        self.rejections[reason] += count
+
+    def addTime(self, phase: str, seconds: float):
+        self.times[phase] += seconds
+
+    def toDict(self) -> dict:
+        """
+        all counters and times, e.g. for a json report
+        """
+        return {
+            'numFieldCalls': self.numFieldCalls,
+            'numFieldBatchCalls': self.numFieldBatchCalls,
+            'numFieldBatchPoints': self.numFieldBatchPoints,
+            'numGridQueries': self.numGridQueries,
+            'numGridCellVisits': self.numGridCellVisits,
+            'numGridPointsCompared': self.numGridPointsCompared,
+            'numSteps': self.numSteps,
+            'numSeedCandidates': self.numSeedCandidates,
+            'numSeedCandidatesRejected': self.numSeedCandidatesRejected,
+            'rejections': dict(self.rejections),
+            'times': dict(self.times),
+        }
+
+    def __repr__(self) -> str:
+        return f"GeneratorStats({self.toDict()})"
@@ -1,30 +1,20 @@
-import math
 from typing import List
 
 from BoundingBox import BoundingBox
+from LookupGridBase import LookupGridBase
 from LookupGridCell import LookupGridCell
 from Vector import Vector
 
 
-class LookupGrid:
+class LookupGrid(LookupGridBase):
 
     def __init__(self, bbox: BoundingBox, dSep: float):
-        self.bbox: BoundingBox = bbox
-        self.dSep: float = dSep
-
-        self.numCols: int = math.ceil(bbox.width / dSep)
-        self.numRows: int = math.ceil(bbox.height / dSep)
+        super().__init__(bbox, dSep)
 
         # 2d array LookupGridCell[numRows][numCols]:
         self.cells: List[List[LookupGridCell]] = [[LookupGridCell() for x in range(self.numCols)] for y in
                                                   range(self.numRows)]
 
-    def gridX(self, x) -> int:
-        return math.floor((x-self.bbox.topLeft.x) / self.dSep)
-
-    def gridY(self, y) -> int:
-        return math.floor((y-self.bbox.topLeft.y) / self.dSep)
-
     def addSamplePoint(self, point: Vector):
         # was occupyCoordinates()
         # unused, but could be used to build "currentStreamlineGrid" for checking for self-intersection
@@ -36,15 +26,6 @@ class LookupGrid:
         for pt in streamline:
             self.findCell(pt).addSamplePoint(pt)
 
-    def _assertInBounds(self, pt: Vector):
-        """
-        internal helper
-        """
-        if pt.x < self.bbox.topLeft.x or pt.x > self.bbox.topLeft.x + self.bbox.width - 1:
-            raise Exception(f'x {pt.x} is out of bounds')
-        if pt.y < self.bbox.topLeft.y or pt.y > self.bbox.topLeft.y + self.bbox.height - 1:
-            raise Exception(f'y {pt.y} is out of bounds')
-
     def findCell(self, point: Vector) -> LookupGridCell:
         self._assertInBounds(point)
         gridX = self.gridX(point.x)
@@ -53,19 +34,14 @@ class LookupGrid:
         return self.cells[gridY][gridX]
 
 
-    def _isOutside(self, pt: Vector) -> bool:
-        """
-        internal helper
-        """
-        return pt.x < self.bbox.topLeft.x or pt.x > self.bbox.topLeft.x + self.bbox.width - 1 or \
-               pt.y < self.bbox.topLeft.y or pt.y > self.bbox.topLeft.y + self.bbox.height - 1
-
-
     def isPointValid(self, pt: Vector, minDistance: float) -> bool:
         """
         1st) checks if pt is inside ouf bounds of the grid
         2nd) returns True if all points inside this grid have distance to passed pt >= minDistance, False otherwise
         """
+        if self.stats is not None:
+            return self._isPointValidCounted(pt, minDistance)
+
         if self._isOutside(pt):
             return False
 
@@ -85,3 +61,26 @@ class LookupGrid:
                     return False
 
         return True
+
+
+    def _isPointValidCounted(self, pt: Vector, minDistance: float) -> bool:
+        """
+        internal helper, isPointValid() which counts the cells visited and the points compared (in self.stats)
+        """
+        self.stats.numGridQueries += 1
+        if self._isOutside(pt):
+            return False
+
+        cx: int = self.gridX(pt.x)
+        cy: int = self.gridY(pt.y)
+        for idxCol in range(max(cx - 1, 0), min(cx + 1, self.numCols - 1) + 1):
+            for idxRow in range(max(cy - 1, 0), min(cy + 1, self.numRows - 1) + 1):
+                samplePoints = self.cells[idxRow][idxCol].samplePoints
+                if samplePoints:
+                    self.stats.numGridCellVisits += 1
+                for sample in samplePoints:
+                    self.stats.numGridPointsCompared += 1
+                    if sample.distanceTo(pt) < minDistance:
+                        return False
+
+        return True
@@ -0,0 +1,108 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Union
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from GeneratorStats import GeneratorStats
+from Vector import Vector
+
+
+class LookupGridBase(ABC):
+    """
+    base class of the grid backends (LookupGrid, ArrayLookupGrid, SparseLookupGrid, DistanceFieldGrid): the bounds,
+    the cell coordinates and the batched queries on top of isPointValid()
+
+    a point is inside the grid if topLeft.x <= x <= topLeft.x + width - 1 and topLeft.y <= y <= topLeft.y + height - 1
+    (the bbox is treated as pixels), points outside are never valid and can not be added.
+    Subclasses implement isPointValid() and the insertion. Backends with a vectorized arePointsValid() set
+    BATCHED_QUERIES, so firstValidIndex() checks all points at once instead of one by one.
+    """
+
+    BATCHED_QUERIES = False
+
+    def __init__(self, bbox: BoundingBox, dSep: float):
+        self.bbox: BoundingBox = bbox
+        self.dSep: float = dSep
+
+        self.numCols: int = math.ceil(bbox.width / dSep)
+        self.numRows: int = math.ceil(bbox.height / dSep)
+        self.stats: GeneratorStats = None # optional, counts the queries (set by StreamlineGenerator)
+
+    def gridX(self, x) -> int:
+        return math.floor((x-self.bbox.topLeft.x) / self.dSep)
+
+    def gridY(self, y) -> int:
+        return math.floor((y-self.bbox.topLeft.y) / self.dSep)
+
+    def _isOutside(self, pt: Vector) -> bool:
+        """
+        internal helper
+        """
+        return pt.x < self.bbox.topLeft.x or pt.x > self.bbox.topLeft.x + self.bbox.width - 1 or \
+               pt.y < self.bbox.topLeft.y or pt.y > self.bbox.topLeft.y + self.bbox.height - 1
+
+    def _outsideMask(self, points: np.ndarray) -> np.ndarray:
+        """
+        internal helper, _isOutside() for an array of shape (N, 2)
+        """
+        x = points[:, 0]
+        y = points[:, 1]
+        return (x < self.bbox.topLeft.x) | (x > self.bbox.topLeft.x + self.bbox.width - 1) | \
+               (y < self.bbox.topLeft.y) | (y > self.bbox.topLeft.y + self.bbox.height - 1)
+
+    def _assertInBounds(self, pt: Vector):
+        """
+        internal helper
+        """
+        if pt.x < self.bbox.topLeft.x or pt.x > self.bbox.topLeft.x + self.bbox.width - 1:
+            raise Exception(f'x {pt.x} is out of bounds')
+        if pt.y < self.bbox.topLeft.y or pt.y > self.bbox.topLeft.y + self.bbox.height - 1:
+            raise Exception(f'y {pt.y} is out of bounds')
+
+    def _assertPointsInBounds(self, points: np.ndarray):
+        """
+        internal helper, _assertInBounds() for an array of shape (N, 2)
+        """
+        outside = self._outsideMask(points)
+        if outside.any():
+            pt = points[np.argmax(outside)]
+            raise Exception(f'point ({pt[0]}, {pt[1]}) is out of bounds')
+
+    @abstractmethod
+    def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+        """
+        returns True if pt is inside the grid and the distance to the nearest sample point is >= minDistance
+        """
+
+    def arePointsValid(self, points: np.ndarray, minDistance: Union[float, np.ndarray]) -> np.ndarray:
+        """
+        batched version of isPointValid() for an array of shape (N, 2), returns a bool array of shape (N,)
+        minDistance is a float or an array of shape (N,) with the distance of each point
+        (loops over the points, see ArrayLookupGrid for a vectorized version)
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if np.ndim(minDistance) == 0:
+            return np.array([self.isPointValid(Vector(x, y), minDistance) for x, y in points.tolist()], dtype=bool)
+
+        return np.array([self.isPointValid(Vector(x, y), d) for (x, y), d in zip(points.tolist(), np.asarray(minDistance).tolist())], dtype=bool)
+
+    def firstValidIndex(self, points: np.ndarray, minDistance: Union[float, np.ndarray]) -> int:
+        """
+        the index of the first point of an array of shape (N, 2) which is valid (see isPointValid()), -1 if none is
+        valid. minDistance is a float or an array of shape (N,).
+        With BATCHED_QUERIES all points are checked at once (arePointsValid()), otherwise the points after it are not
+        checked.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.BATCHED_QUERIES:
+            valid = self.arePointsValid(points, minDistance)
+            return int(np.argmax(valid)) if valid.any() else -1
+
+        minDistances = np.asarray(minDistance).tolist() if np.ndim(minDistance) > 0 else [minDistance] * len(points)
+        for idx, ((x, y), d) in enumerate(zip(points.tolist(), minDistances)):
+            if self.isPointValid(Vector(x, y), d):
+                return idx
+
+        return -1
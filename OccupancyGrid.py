@@ -0,0 +1,49 @@
+import math
+from typing import Dict, List, Tuple
+
+from Vector import Vector
+
+
+class OccupancyGrid:
+    """
+    the "currentStreamlineGrid": a lightweight grid holding the points of the streamline which is currently built,
+    used by the StreamlineIntegrator to detect if a streamline runs into itself (ping-pong).
+
+    Unlike LookupGrid it is sparse (a dict of cells) and unbounded, because its cell size is the (small) step size
+    and only the cells touched by a single streamline are ever needed.
+    """
+
+    def __init__(self, cellSize: float):
+        self.cellSize: float = cellSize
+        self.cells: Dict[Tuple[int, int], List[Vector]] = {}
+
+    def _cellXY(self, pt: Vector) -> Tuple[int, int]:
+        return math.floor(pt.x / self.cellSize), math.floor(pt.y / self.cellSize)
+
+    def clear(self):
+        self.cells = {}
+
+    def addSamplePoint(self, point: Vector):
+        key = self._cellXY(point)
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [point]
+        else:
+            cell.append(point)
+
+    def hasPointWithin(self, pt: Vector, maxDistance: float) -> bool:
+        """
+        returns True if some point of this grid has a distance <= maxDistance to passed pt, False otherwise
+        maxDistance must not be greater than cellSize (only the neighbouring cells are searched)
+        """
+        cx, cy = self._cellXY(pt)
+        for idxCol in (cx - 1, cx, cx + 1):
+            for idxRow in (cy - 1, cy, cy + 1):
+                cell = self.cells.get((idxCol, idxRow))
+                if cell is None:
+                    continue
+                for existingPt in cell:
+                    if existingPt.distanceTo(pt) <= maxDistance:
+                        return True
+
+        return False
@@ -0,0 +1,99 @@
+import math
+from typing import Union
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from Vector import Vector
+
+
+class RasterFlowField:
+    """
+    a flow field sampled on a regular grid (e.g. the U/V output of a simulation), bilinearly interpolated.
+    Can be passed to StreamlineGenerator instead of a flowFieldFunction, it has a single point path (__call__) and a
+    batch path (evaluateBatch(), see BatchFlowField).
+
+    u and v are 2D arrays of shape (numRows, numCols) with the x / y components of the velocities.
+    extent is the area covered by the samples: u[0, 0] is at extent.topLeft, u[-1, -1] at the opposite corner.
+    Outside of the extent, and where one of the 4 surrounding samples is NaN, the field is not defined (None / NaN).
+
+    The arrays are only read where the field is evaluated, so they can be memory-mapped (see fromNpy()).
+    """
+
+    def __init__(self, u: np.ndarray, v: np.ndarray, extent: BoundingBox):
+        if u.ndim != 2 or u.shape != v.shape:
+            raise Exception(f'u and v must be 2D arrays of the same shape, got {u.shape} and {v.shape}')
+        if u.shape[0] < 2 or u.shape[1] < 2:
+            raise Exception(f'at least 2x2 samples are needed, got {u.shape}')
+
+        self.u: np.ndarray = u
+        self.v: np.ndarray = v
+        self.extent: BoundingBox = extent
+        self.numRows: int = u.shape[0]
+        self.numCols: int = u.shape[1]
+        self._cellWidth: float = extent.width / (self.numCols - 1)
+        self._cellHeight: float = extent.height / (self.numRows - 1)
+
+    @classmethod
+    def fromNpy(cls, path: str, extent: BoundingBox) -> "RasterFlowField":
+        """
+        opens an .npy file of shape (2, numRows, numCols) (u and v stacked) memory-mapped, nothing is read up front
+        """
+        uv = np.load(path, mmap_mode='r')
+        if uv.ndim != 3 or uv.shape[0] != 2:
+            raise Exception(f'{path}: expected an array of shape (2, numRows, numCols), got {uv.shape}')
+
+        return cls(uv[0], uv[1], extent)
+
+    def __call__(self, coords: Vector) -> Union[Vector, None]:
+        # ---- position in the grid (in cells)
+        gx = (coords.x - self.extent.topLeft.x) / self._cellWidth
+        gy = (coords.y - self.extent.topLeft.y) / self._cellHeight
+        if not (0 <= gx <= self.numCols - 1 and 0 <= gy <= self.numRows - 1):
+            return None # outside (or NaN coords)
+
+        col = min(int(gx), self.numCols - 2)
+        row = min(int(gy), self.numRows - 2)
+        fx = gx - col
+        fy = gy - row
+
+        # ---- bilinear interpolation of the 4 surrounding samples
+        velocity = []
+        for data in (self.u, self.v):
+            window = data[row:row + 2, col:col + 2]
+            top = float(window[0, 0]) * (1 - fx) + float(window[0, 1]) * fx
+            bottom = float(window[1, 0]) * (1 - fx) + float(window[1, 1]) * fx
+            velocity.append(top * (1 - fy) + bottom * fy)
+
+        if math.isnan(velocity[0]) or math.isnan(velocity[1]):
+            return None
+
+        return Vector(velocity[0], velocity[1])
+
+    def evaluateBatch(self, coords: np.ndarray) -> np.ndarray:
+        """
+        coords is an array of shape (N, 2), returns the velocities as array of shape (N, 2), NaN where not defined
+        """
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        velocities = np.full(coords.shape, np.nan, dtype=np.float64)
+
+        gx = (coords[:, 0] - self.extent.topLeft.x) / self._cellWidth
+        gy = (coords[:, 1] - self.extent.topLeft.y) / self._cellHeight
+        inside = (gx >= 0) & (gx <= self.numCols - 1) & (gy >= 0) & (gy <= self.numRows - 1)
+        gx = gx[inside]
+        gy = gy[inside]
+
+        col = np.minimum(gx.astype(np.int64), self.numCols - 2)
+        row = np.minimum(gy.astype(np.int64), self.numRows - 2)
+        fx = gx - col
+        fy = gy - row
+
+        # ---- bilinear interpolation of the 4 surrounding samples (fancy indexing only reads these from a memmap)
+        for idxComponent, data in enumerate((self.u, self.v)):
+            top = data[row, col] * (1 - fx) + data[row, col + 1] * fx
+            bottom = data[row + 1, col] * (1 - fx) + data[row + 1, col + 1] * fx
+            velocities[inside, idxComponent] = top * (1 - fy) + bottom * fy
+
+        velocities[np.isnan(velocities).any(axis=1)] = np.nan # not defined if one of the components is not defined
+
+        return velocities
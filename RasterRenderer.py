@@ -0,0 +1,166 @@
+import struct
+import zlib
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from Vector import Vector
+from colorMap import velocityColors
+
+
+class RasterRenderer:
+    """
+    draws streamlines directly into a NumPy RGBA buffer, without a svg in between
+
+    the lines are anti-aliased by splatting: each segment is sampled every sampleSpacing pixels and each sample is
+    distributed (bilinear weights) to the 4 nearest pixels, so a pixel gets the length of the lines running through it
+    as coverage. The samples are collected and added to the buffer in bulk (one np.bincount per flush), there is no
+    per-pixel python code.
+
+    usage:
+        renderer = RasterRenderer(bbox, 800, 600)
+        for sl, speeds in zip(streamlines, generator.getStreamlineSpeeds()):
+            renderer.addStreamline(sl, normalizeSpeeds(speeds, minSpeed, maxSpeed))
+        renderer.savePng('out.png')
+    """
+
+    def __init__(self, bbox: BoundingBox, width: int, height: int, background: Tuple[int, int, int, int] = (0, 0, 0, 255),
+                 lineWidth: float = 1.0, sampleSpacing: float = 0.5, flushSize: int = 1 << 20):
+        """
+        width, height: size of the image in pixels, the bbox is scaled to it
+        lineWidth: in pixels, scales the coverage (lines are not made wider)
+        flushSize: number of pending samples before they are added to the buffer
+        """
+        self.bbox: BoundingBox = bbox
+        self.width: int = width
+        self.height: int = height
+        self.background: np.ndarray = np.array(background, dtype=np.float64)
+        self.lineWidth: float = lineWidth
+        self.sampleSpacing: float = sampleSpacing
+        self._flushSize: int = flushSize
+        self._scaleX: float = width / bbox.width
+        self._scaleY: float = height / bbox.height
+        # ---- accumulators: the coverage and the coverage weighted color sums per pixel
+        self._coverage: np.ndarray = np.zeros(width * height, dtype=np.float64)
+        self._colorSums: np.ndarray = np.zeros((3, width * height), dtype=np.float64)
+        # ---- pending samples: (x, y, weight, colors)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._numPending: int = 0
+
+    def addStreamline(self, streamline: Union[np.ndarray, List[Vector]], values01: np.ndarray = None,
+                      color: Tuple[int, int, int] = (0, 0, 255)):
+        """
+        streamline: array of shape (N, 2) (see StreamlineCollection) or list of Vectors
+        values01: optional, per point a value in [0..1] (e.g. the normalized speed, see colorMap.normalizeSpeeds()), the
+                  segments get the color of the mean value of their 2 points (colorMap.velocityColors()).
+                  If not passed, all segments have the same color.
+        """
+        if isinstance(streamline, np.ndarray):
+            coords = streamline.reshape(-1, 2)
+        else:
+            coords = np.array([pt.asTuple() for pt in streamline], dtype=np.float64).reshape(-1, 2)
+        if len(coords) < 2:
+            return
+
+        # ---- to pixel coords, pixel centers are at .5
+        px = (coords[:, 0] - self.bbox.topLeft.x) * self._scaleX
+        py = (coords[:, 1] - self.bbox.topLeft.y) * self._scaleY
+        dx = np.diff(px)
+        dy = np.diff(py)
+        segmentLengths = np.sqrt(dx * dx + dy * dy)
+
+        if values01 is None:
+            segmentColors = np.broadcast_to(np.array(color, dtype=np.float64), (len(dx), 3))
+        else:
+            values = np.asarray(values01, dtype=np.float64)
+            segmentColors = velocityColors((values[:-1] + values[1:]) / 2.0)
+
+        # ---- samples in the middle of numSamples equal parts of each segment
+        numSamples = np.maximum(1, np.ceil(segmentLengths / self.sampleSpacing).astype(np.int64))
+        idxSegment = np.repeat(np.arange(len(dx)), numSamples)
+        idxInSegment = np.arange(len(idxSegment)) - np.repeat(np.cumsum(numSamples) - numSamples, numSamples)
+        t = (idxInSegment + 0.5) / numSamples[idxSegment]
+        self._pending.append((
+            px[idxSegment] + dx[idxSegment] * t,
+            py[idxSegment] + dy[idxSegment] * t,
+            (segmentLengths / numSamples * self.lineWidth)[idxSegment],
+            segmentColors[idxSegment],
+        ))
+        self._numPending += len(idxSegment)
+        if self._numPending >= self._flushSize:
+            self._flush()
+
+    def toRgba(self) -> np.ndarray:
+        """
+        returns the image as array of shape (height, width, 4), dtype uint8
+        """
+        self._flush()
+        coverage = np.minimum(self._coverage, 1.0)
+        colors = np.zeros((self.width * self.height, 3), dtype=np.float64)
+        covered = self._coverage > 0
+        colors[covered] = (self._colorSums[:, covered] / self._coverage[covered]).T
+
+        rgba = np.empty((self.width * self.height, 4), dtype=np.float64)
+        rgba[:, :3] = self.background[:3] * (1.0 - coverage[:, np.newaxis]) + colors * coverage[:, np.newaxis]
+        rgba[:, 3] = self.background[3] * (1.0 - coverage) + 255.0 * coverage
+
+        return np.rint(rgba).astype(np.uint8).reshape(self.height, self.width, 4)
+
+    def savePng(self, pathDestFile: str, compressionLevel: int = 6):
+        """
+        writes the image as 8 bit RGBA png, only zlib and struct of the standard library are used
+        """
+        rgba = self.toRgba()
+        # each row starts with the filter type (0 = none)
+        raw = np.concatenate([np.zeros((self.height, 1), dtype=np.uint8), rgba.reshape(self.height, -1)], axis=1)
+        with open(pathDestFile, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n')
+            f.write(_pngChunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 6, 0, 0, 0)))
+            f.write(_pngChunk(b'IDAT', zlib.compress(raw.tobytes(), compressionLevel)))
+            f.write(_pngChunk(b'IEND', b''))
+
+    def saveNpy(self, pathDestFile: str):
+        """
+        writes the RGBA buffer as .npy file, shape (height, width, 4)
+        """
+        np.save(pathDestFile, self.toRgba())
+
+    def _flush(self):
+        """
+        private helper, adds the pending samples to the accumulators, each sample is distributed to the 4 nearest
+        pixels with bilinear weights
+        """
+        if not self._pending:
+            return
+
+        x, y, weights, colors = (np.concatenate(parts) for parts in zip(*self._pending))
+        self._pending = []
+        self._numPending = 0
+
+        gx = x - 0.5
+        gy = y - 0.5
+        col0 = np.floor(gx)
+        row0 = np.floor(gy)
+        fx = gx - col0
+        fy = gy - row0
+        col0 = col0.astype(np.int64)
+        row0 = row0.astype(np.int64)
+        numPixels = self.width * self.height
+        for dCol, dRow, cornerWeights in ((0, 0, (1 - fx) * (1 - fy)), (1, 0, fx * (1 - fy)),
+                                          (0, 1, (1 - fx) * fy), (1, 1, fx * fy)):
+            col = col0 + dCol
+            row = row0 + dRow
+            inside = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+            idxPixel = (row * self.width + col)[inside]
+            w = (weights * cornerWeights)[inside]
+            self._coverage += np.bincount(idxPixel, weights=w, minlength=numPixels)
+            for idxChannel in range(3):
+                self._colorSums[idxChannel] += np.bincount(idxPixel, weights=w * colors[inside, idxChannel], minlength=numPixels)
+
+
+def _pngChunk(chunkType: bytes, data: bytes) -> bytes:
+    """
+    internal helper, a png chunk: length, type, data and crc
+    """
+    return struct.pack('>I', len(data)) + chunkType + data + struct.pack('>I', zlib.crc32(chunkType + data) & 0xffffffff)
@@ -0,0 +1,24 @@
+from typing import Callable
+
+from Vector import Vector
+from rk4 import rk4
+
+
+class Rk4Integrator:
+    """
+    the default integrator of StreamlineIntegrator: one fixed RK4 step (rk4()) per point of the streamline
+
+    the integrator interface (an alternative integrator, like DormandPrinceIntegrator, needs these 2 methods):
+
+        begin(start, stepSize, getVelocity)
+            called before a streamline is grown into one direction from start (stepSize is negative for BACKWARD)
+
+        step(pos, stepSize, getVelocity, k1) -> Vector or None
+            returns the displacement from pos (the last point) to the next point of the streamline, which must not be
+            farther away than abs(stepSize). k1 is the normalized velocity at pos. None if the field is not defined.
+    """
+
+    def begin(self, start: Vector, stepSize: float, getVelocity: Callable):
+        pass # stateless
+
+    step = staticmethod(rk4) # step(pos, stepSize, getVelocity, k1), no extra call per point
@@ -0,0 +1,89 @@
+from typing import Dict, List
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from LookupGridBase import LookupGridBase
+from Vector import Vector
+
+
+class SparseLookupGrid(LookupGridBase):
+    """
+    alternative backend for LookupGrid with the same API and the same results (cells of size dSep, a query checks the
+    3 x 3 cells around the point), for huge bounding boxes
+
+    LookupGrid creates all numRows * numCols cells (a LookupGridCell with its own list each) up front, for a large bbox
+    with a small dSep millions of objects before the first streamline exists. Here the cells are a dict of the cells
+    which hold sample points, keyed by the packed cell index (row * numCols + col) and created when the first sample
+    point lands in them: creating the grid costs nothing and the memory depends on the cells used, not on the bbox.
+    A query costs one dict lookup per cell of the neighbourhood instead of a list index, so for small, densely
+    covered domains LookupGrid / ArrayLookupGrid are a little faster.
+
+    usage: StreamlineGenerator(field, dSep, dTest, lookupGridClass=SparseLookupGrid)
+    """
+
+    def __init__(self, bbox: BoundingBox, dSep: float):
+        super().__init__(bbox, dSep)
+        self.cells: Dict[int, List[Vector]] = {} # packed cell index -> sample points, only the cells with points
+
+    def numCells(self) -> int:
+        """
+        the number of cells which were created (hold sample points)
+        """
+        return len(self.cells)
+
+    def addSamplePoint(self, point: Vector):
+        self._assertInBounds(point)
+        key = self.gridY(point.y) * self.numCols + self.gridX(point.x)
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [point]
+        else:
+            cell.append(point)
+
+    def addStreamline(self, streamline: List[Vector]):
+        for pt in streamline:
+            self.addSamplePoint(pt)
+
+    def addPoints(self, points: np.ndarray):
+        """
+        bulk insertion of sample points, points is an array of shape (N, 2)
+        """
+        for x, y in np.asarray(points, dtype=np.float64).reshape(-1, 2).tolist():
+            self.addSamplePoint(Vector(x, y))
+
+    def _hasPointWithin(self, pt: Vector, minDistance: float, numRings: int) -> bool:
+        """
+        internal helper, True if a sample point in the cells within numRings rings around the cell of pt is nearer
+        than minDistance to pt
+        """
+        cx: int = self.gridX(pt.x)
+        cy: int = self.gridY(pt.y)
+        col0 = max(cx - numRings, 0)
+        col1 = min(cx + numRings, self.numCols - 1)
+        for idxRow in range(max(cy - numRings, 0), min(cy + numRings, self.numRows - 1) + 1):
+            rowKey = idxRow * self.numCols
+            for idxCol in range(col0, col1 + 1):
+                cell = self.cells.get(rowKey + idxCol)
+                if cell is None:
+                    continue
+                if self.stats is not None:
+                    self.stats.numGridCellVisits += 1
+                    self.stats.numGridPointsCompared += len(cell)
+                for sample in cell:
+                    if sample.distanceTo(pt) < minDistance:
+                        return True
+
+        return False
+
+    def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+        """
+        1st) checks if pt is inside ouf bounds of the grid
+        2nd) returns True if all points inside this grid have distance to passed pt >= minDistance, False otherwise
+        """
+        if self.stats is not None:
+            self.stats.numGridQueries += 1
+        if self._isOutside(pt):
+            return False
+
+        return not self._hasPointWithin(pt, minDistance, 1)
@@ -0,0 +1,141 @@
+from typing import Iterator, List
+
+import numpy as np
+
+from Vector import Vector
+from simplify import simplifyIndexes
+
+
+class StreamlineCollection:
+    """
+    compact storage for many streamlines (a ragged array, like the CSR layout of sparse matrices):
+    the points of all streamlines are in one flat float64 buffer, the streamline idx has the points
+
+        coords[offsets[idx]:offsets[idx + 1]]
+
+    Per point the normalized velocity (direction) and the speed are stored too, NaN where not known.
+    collection[idx] returns a numpy view of shape (N, 2), no copy and no Vector objects.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._coords: np.ndarray = np.empty((capacity, 2), dtype=np.float64)
+        self._directions: np.ndarray = np.empty((capacity, 2), dtype=np.float64)
+        self._speeds: np.ndarray = np.empty(capacity, dtype=np.float64)
+        self._offsets: List[int] = [0]
+
+    @classmethod
+    def fromVectorLists(cls, streamlines: List[List[Vector]]) -> "StreamlineCollection":
+        collection = cls(max(1, sum(len(sl) for sl in streamlines)))
+        for sl in streamlines:
+            collection.append(np.array([pt.asTuple() for pt in sl], dtype=np.float64).reshape(-1, 2))
+
+        return collection
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idxStreamline: int) -> np.ndarray:
+        return self._coords[self._offsets[idxStreamline]:self._offsets[idxStreamline + 1]]
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for idxStreamline in range(len(self)):
+            yield self[idxStreamline]
+
+    def numPoints(self) -> int:
+        """
+        of all streamlines
+        """
+        return self._offsets[-1]
+
+    @property
+    def coords(self) -> np.ndarray:
+        """
+        the points of all streamlines, array of shape (numPoints(), 2)
+        """
+        return self._coords[:self.numPoints()]
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        array of shape (len() + 1,), the points of streamline idx are coords[offsets[idx]:offsets[idx + 1]]
+        """
+        return np.array(self._offsets, dtype=np.int64)
+
+    def directions(self, idxStreamline: int) -> np.ndarray:
+        return self._directions[self._offsets[idxStreamline]:self._offsets[idxStreamline + 1]]
+
+    def speeds(self, idxStreamline: int) -> np.ndarray:
+        return self._speeds[self._offsets[idxStreamline]:self._offsets[idxStreamline + 1]]
+
+    def append(self, coords: np.ndarray, directions: np.ndarray = None, speeds: np.ndarray = None):
+        """
+        adds a streamline, coords (and directions) are arrays of shape (N, 2), speeds of shape (N,)
+        """
+        start = self.numPoints()
+        end = start + len(coords)
+        if end > len(self._coords):
+            self._grow(end)
+
+        self._coords[start:end] = coords
+        self._directions[start:end] = np.nan if directions is None else directions
+        self._speeds[start:end] = np.nan if speeds is None else speeds
+        self._offsets.append(end)
+
+    def _grow(self, minCapacity: int):
+        """
+        internal helper, at least doubles the capacity of the buffers (views returned before stay valid, they keep the old buffer)
+        """
+        capacity = max(minCapacity, 2 * len(self._coords))
+        numPoints = self.numPoints()
+        for name in ('_coords', '_directions', '_speeds'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:numPoints] = old[:numPoints]
+            setattr(self, name, new)
+
+    def __getstate__(self) -> dict:
+        """
+        only the used part of the buffers is pickled (e.g. when passed between processes)
+        """
+        numPoints = self.numPoints()
+        return {'_coords': self._coords[:numPoints].copy(), '_directions': self._directions[:numPoints].copy(),
+                '_speeds': self._speeds[:numPoints].copy(), '_offsets': self._offsets}
+
+    def toArrays(self) -> dict:
+        """
+        the used part of the buffers: coords, offsets, directions and speeds, e.g. for np.savez()
+        """
+        numPoints = self.numPoints()
+        return {'coords': self._coords[:numPoints], 'offsets': self.offsets, 'directions': self._directions[:numPoints],
+                'speeds': self._speeds[:numPoints]}
+
+    @classmethod
+    def fromArrays(cls, coords: np.ndarray, offsets: np.ndarray, directions: np.ndarray = None, speeds: np.ndarray = None) -> "StreamlineCollection":
+        """
+        the reverse of toArrays(), e.g. with the arrays of np.load()
+        """
+        collection = cls(max(1, len(coords)))
+        collection.append(coords, directions, speeds)
+        collection._offsets = [int(offset) for offset in offsets]
+
+        return collection
+
+    def simplified(self, tolerance: float, speedTolerance: float = None) -> "StreamlineCollection":
+        """
+        a new collection with the streamlines simplified by Douglas-Peucker (see simplify.simplifyIndexes()), e.g. for
+        smaller output files. No point is moved by more than tolerance. If speedTolerance is passed, points are kept
+        where the speed differs by more than it from the speed interpolated along the simplified segment (for the colors).
+        The directions and speeds of the kept points are kept.
+        Use it for the output only: the grid of the generator needs the dense points for the dTest / dSep checks.
+        """
+        arrays = self.toArrays()
+        offsets = arrays['offsets']
+        kept = [offsets[idx] + simplifyIndexes(self[idx], tolerance, self.speeds(idx), speedTolerance) for idx in range(len(self))]
+        keptIndexes = np.concatenate(kept) if kept else np.zeros(0, dtype=np.int64)
+        keptOffsets = np.concatenate([[0], np.cumsum([len(indexes) for indexes in kept], dtype=np.int64)])
+
+        return StreamlineCollection.fromArrays(arrays['coords'][keptIndexes], keptOffsets, arrays['directions'][keptIndexes],
+                                               arrays['speeds'][keptIndexes])
+
+    def toVectorLists(self) -> List[List[Vector]]:
+        return [[Vector(x, y) for x, y in sl.tolist()] for sl in self]
@@ -1,89 +1,485 @@
+import logging
 import math
-from typing import Callable, List, Union
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Iterable, Iterator, List, Set, Tuple, Union
 
+import numpy as np
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BatchFlowField import evaluateFieldBatch
+from BatchStreamlineIntegrator import BatchStreamlineIntegrator
 from BoundingBox import BoundingBox
+from GeneratorStats import GeneratorStats
 from LookupGrid import LookupGrid
+from OccupancyGrid import OccupancyGrid
+from StreamlineCollection import StreamlineCollection
 from StreamlineIntegrator import StreamlineIntegrator
+from VariableDensityGrid import VariableDensityGrid
 from Vector import Vector
 
 
+logger = logging.getLogger(__name__)
+
+
 class StreamlineGenerator:
 
     # defaults..
     DEFAULT_D_SEP = 20
     DEFAULT_D_TEST_FACTOR = 0.333 # dTest = dSep * DEFAULT_D_TEST_FACTOR
     DEFAULT_TIME_STEP = 1.0 # the approx. length of a streamline oof a single time step
+    SEED_SEARCH_CHUNK_SIZE = 256 # the seed point search reads the points of a streamline in chunks of this size
+    DEFAULT_REUSE_TOLERANCE = 1e-6 # see buildStreamlinesFromPrevious()
+    DEFAULT_CHECKPOINT_INTERVAL = 600.0 # seconds, see setCheckpoint()
+    CHECKPOINT_VERSION = 2
+    D_SEP_FUNCTION_SAMPLES = 17 # a dSep function is sampled at 17 x 17 points of the bbox for the cell size of the grid
 
-    def __init__(self, flowFieldFunction: Callable, dSep: float=None, dTest: float=None, stepSize:float=DEFAULT_TIME_STEP):
-        self._finishedStreamlineIndexes: List[int] = None
-        self.d_sep = self.DEFAULT_D_SEP if dSep is None else dSep
-        self.d_test = dTest if dTest is not None else dSep * self.DEFAULT_D_TEST_FACTOR # dTest is the the distance (to other streamlines) where streamline generation stops
+    # ---- seed order enums (which unfinished streamline is searched for the next seed point first)
+    SEED_ORDER_NEWEST_FIRST = 1 # the newest streamline (a stack), the original order of this implementation
+    SEED_ORDER_FIFO = 2 # the oldest streamline (a queue), as in the paper of Jobard and Lefer
+
+    def __init__(self, flowFieldFunction: Callable, dSep: Union[float, Callable]=None, dTest: float=None, stepSize:float=DEFAULT_TIME_STEP, lookupGridClass: Callable=LookupGrid, seedBatchSize: int=1, seedOrder: int=SEED_ORDER_NEWEST_FIRST, integrator=None, collectStats: bool=False):
+        """
+        flowFieldFunction: a callable returning the velocity (Vector) at passed coords (Vector), or a field object with an
+                           additional batch path (see BatchFlowField). Expensive fields can be wrapped in a CachedFlowField.
+        dSep: the distance of the streamlines, a float or a function dSep(coords: Vector) -> float for a varying density.
+              With a function the seed point candidates are placed (and checked) at the dSep of their point on the
+              streamline, the grid is a VariableDensityGrid with the smallest dSep sampled over the bbox as cell size,
+              and dTest is constant (default: DEFAULT_D_TEST_FACTOR * this smallest dSep).
+              Not supported with seedBatchSize > 1 and buildStreamlinesFromPrevious().
+        lookupGridClass: the grid backend, LookupGrid, ArrayLookupGrid, SparseLookupGrid or DistanceFieldGrid (or any
+                         subclass of LookupGridBase, or class with the same constructor and addStreamline() /
+                         isPointValid() / arePointsValid() methods)
+        seedBatchSize: if > 1, up to seedBatchSize seed point candidates are integrated at once (lock-step, see
+                       BatchStreamlineIntegrator). This fills the domain in a different order than the default (1).
+        seedOrder: SEED_ORDER_NEWEST_FIRST (default) or SEED_ORDER_FIFO
+        integrator: the integrator of the streamlines, Rk4Integrator (default, fixed steps) or DormandPrinceIntegrator
+                    (adaptive steps, resampled to stepSize). The lanes of seedBatchSize > 1 always use fixed RK4 steps,
+                    with an integrator the seed points of buildStreamlinesFromSeeds() are integrated one by one.
+        collectStats: if True, each build collects counters and timers of its hot paths, see getStats()
+        """
+        if integrator is not None and seedBatchSize > 1:
+            raise Exception('an integrator can not be combined with seedBatchSize > 1, the lanes are integrated with fixed RK4 steps')
+        self._dSepFunction: Callable = dSep if callable(dSep) else None
+        if self._dSepFunction is not None:
+            if seedBatchSize > 1:
+                raise Exception('a dSep function can not be combined with seedBatchSize > 1')
+            if lookupGridClass is LookupGrid:
+                lookupGridClass = VariableDensityGrid
+            elif lookupGridClass is not VariableDensityGrid:
+                raise Exception('a dSep function needs the VariableDensityGrid')
+            dSep = None # set per build, see _initDensity()
+        self._finishedStreamlineIndexes: Set[int] = None
+        self._unfinishedStreamlines: Deque[int] = None # indexes of the streamlines which may have seed point candidates left
+        self._seedCursors: List[int] = None # per streamline: index of the first point whose seed point candidates were not rejected yet
+        self._seedOrder: int = seedOrder
+        self._progressCallback: Callable = None
+        self._numSamplePoints: int = 0
+        self._startTime: float = None
+        self.d_sep = self.DEFAULT_D_SEP if dSep is None and self._dSepFunction is None else dSep # with a dSep function: the smallest dSep
+        self.d_test = dTest if dTest is not None or self.d_sep is None else self.d_sep * self.DEFAULT_D_TEST_FACTOR # dTest is the the distance (to other streamlines) where streamline generation stops
+        self._dTest = dTest # as passed
         self._flowFieldFunction: Callable = flowFieldFunction
-        self._streamlines: List[List[Vector]] = None
+        self._streamlines: StreamlineCollection = None # with the normalized velocity and the speed per point
+        self._seedPoints: List[Vector] = None # per streamline: the seed point it was integrated from
         self._lookupGrid: LookupGrid = None
+        self._lookupGridClass: Callable = lookupGridClass
         self._stepSize = stepSize
-
-
-    def vectorFieldNormalized(self, coords: Vector) -> Union[Vector,None]:
+        self._seedBatchSize: int = seedBatchSize
+        self._streamlineIntegrator: StreamlineIntegrator = None
+        self._batchIntegrator: BatchStreamlineIntegrator = None
+        self._integrator = integrator
+        self._collectStats: bool = collectStats
+        self._stats: GeneratorStats = None # of the last build, None if collectStats is False
+        self._bbox: BoundingBox = None # of the current build
+        self._checkpointPath: str = None
+        self._checkpointInterval: float = None
+        self._lastCheckpointTime: float = None
+
+
+    def sampleVectorField(self, coords: Vector) -> Tuple[Union[Vector, None], Union[Vector, None]]:
         """
-        the vector field, but every vector has same length of 1
-        this is a callback passed to runge-kutta
+        returns the velocity at coords and the normalized velocity (see vectorFieldNormalized())
+        the velocity is None if the field is not defined at coords, the normalized velocity is None at a singularity too
         """
-        p2: Vector = self._flowFieldFunction(coords)
+        if self._stats is None:
+            p2: Vector = self._flowFieldFunction(coords)
+        else:
+            t0 = time.perf_counter()
+            p2: Vector = self._flowFieldFunction(coords)
+            self._stats.addTime(GeneratorStats.PHASE_FIELD, time.perf_counter() - t0)
+            self._stats.numFieldCalls += 1
 
         if p2 is None:
-            return None
+            return None, None
 
         if p2.isNan():
-            return None # Not defined. e.g. Math.log(-1)
+            return None, None # Not defined. e.g. Math.log(-1)
 
         # We need normalized field.
         l_squared = p2.x ** 2 + p2.y ** 2
         if l_squared == 0:
-            return None # singularity
+            return p2, None # singularity
         l = math.sqrt(l_squared)
 
-        return Vector(p2.x / l, p2.y / l)
+        return p2, Vector(p2.x / l, p2.y / l)
+
+
+    def vectorFieldNormalized(self, coords: Vector) -> Union[Vector,None]:
+        """
+        the vector field, but every vector has same length of 1
+        this is a callback passed to runge-kutta
+        """
+        return self.sampleVectorField(coords)[1]
 
 
+    def sampleVectorFieldBatch(self, coords: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        batched version of sampleVectorField(), coords is an array of shape (N, 2)
+        returns two arrays of shape (N, 2), rows where the field is not defined (or has a singularity) are NaN
+        """
+        if self._stats is None:
+            velocities = evaluateFieldBatch(self._flowFieldFunction, coords)
+        else:
+            t0 = time.perf_counter()
+            velocities = evaluateFieldBatch(self._flowFieldFunction, coords)
+            self._stats.addTime(GeneratorStats.PHASE_FIELD, time.perf_counter() - t0)
+            self._stats.numFieldBatchCalls += 1
+            self._stats.numFieldBatchPoints += len(coords)
+        lengths = self._lengths(velocities)
+        lengths[lengths == 0] = np.nan # singularity
+
+        return velocities, velocities / lengths[:, np.newaxis]
+
+
+    @staticmethod
+    def _lengths(velocities: np.ndarray) -> np.ndarray:
+        """
+        private helper, the lengths of the vectors of an array of shape (N, 2)
+        (vectorized, may differ from sampleVectorField() in the last bit: x * x and x ** 2 round differently)
+        """
+        return np.sqrt(velocities[:, 0] * velocities[:, 0] + velocities[:, 1] * velocities[:, 1])
+
 
+    def vectorFieldNormalizedBatch(self, coords: np.ndarray) -> np.ndarray:
+        """
+        batched version of vectorFieldNormalized(), coords is an array of shape (N, 2)
+        returns an array of shape (N, 2), rows where the field is not defined or has a singularity are NaN
+        """
+        return self.sampleVectorFieldBatch(coords)[1]
 
 
     def _getSeedpoint(self, idxStreamline: int) -> Union[Vector, None]:
         """
         private helper
+
+        the search resumes at the cursor of the streamline: the candidates of the points before the cursor were both
+        rejected and stay invalid, because the grid only gets more points.
+        the normalized velocities at the points were recorded when the streamline was built, the field is not evaluated again.
+        The candidates (at dSep on both sides of each point, in the order of the points) are computed per chunk of
+        points as arrays and checked with a single (batched) query of the grid.
         """
-        for pointOnStreamline in self._streamlines[idxStreamline]:
-            #  make points orthogonal to streamline with distance = D_SEP / -D_SEP
-            perpendicular = self.vectorFieldNormalized(pointOnStreamline).perpendicularClockwise()
-            candidate = pointOnStreamline + perpendicular * self.d_sep
-            if self._lookupGrid.isPointValid(candidate, self.d_sep):
-                return candidate
+        streamline = self._streamlines[idxStreamline]
+        directions = self._streamlines.directions(idxStreamline)
+        for idxChunk in range(self._seedCursors[idxStreamline], len(streamline), self.SEED_SEARCH_CHUNK_SIZE):
+            idxChunkEnd = idxChunk + self.SEED_SEARCH_CHUNK_SIZE
+            chunkDirections = directions[idxChunk:idxChunkEnd]
+            idxPoints = np.flatnonzero(~np.isnan(chunkDirections).any(axis=1)) # no perpendicular at a singularity
+            if len(idxPoints) == 0:
+                continue
+            pointsOnStreamline = streamline[idxChunk:idxChunkEnd][idxPoints]
+
+            #  make points orthogonal to streamline with distance = D_SEP / -D_SEP (the same arithmetic as the Vector
+            #  operations, so the candidates are bit-identical)
+            perpendiculars = np.stack([-chunkDirections[idxPoints, 1], chunkDirections[idxPoints, 0]], axis=1)
+            if self._dSepFunction is None:
+                dSep = self.d_sep
+                minDistances = self.d_sep
+            else:
+                dSeps = self._dSepsAt(pointsOnStreamline)
+                dSep = dSeps[:, np.newaxis]
+                minDistances = np.repeat(dSeps, 2) # the candidates on both sides of a point
+            candidates = np.empty((2 * len(idxPoints), 2), dtype=np.float64)
+            candidates[0::2] = pointsOnStreamline + perpendiculars * dSep
+            candidates[1::2] = pointsOnStreamline + perpendiculars * (-dSep)
+
+            idxCandidate = self._firstValidCandidate(candidates, minDistances)
+            if self._stats is not None:
+                numChecked = len(candidates) if idxCandidate < 0 else idxCandidate + 1
+                self._stats.numSeedCandidates += numChecked
+                self._stats.numSeedCandidatesRejected += numChecked if idxCandidate < 0 else idxCandidate
+            if idxCandidate >= 0:
+                self._seedCursors[idxStreamline] = idxChunk + int(idxPoints[idxCandidate // 2])
+                x, y = candidates[idxCandidate].tolist()
+                return Vector(x, y)
+
+        self._seedCursors[idxStreamline] = len(streamline)
+        return None
 
-            candidate = pointOnStreamline + perpendicular * (-self.d_sep)
-            if self._lookupGrid.isPointValid(candidate, self.d_sep):
-                return candidate
 
-        return None
+    def _firstValidCandidate(self, candidates: np.ndarray, minDistances: Union[float, np.ndarray]) -> int:
+        """
+        private helper, index of the first valid (dSep) seed point candidate, -1 if none is valid
+        uses grid.firstValidIndex() if the grid has it
+        """
+        if hasattr(self._lookupGrid, 'firstValidIndex'):
+            return self._lookupGrid.firstValidIndex(candidates, minDistances)
 
+        valid = self._lookupGrid.arePointsValid(candidates, minDistances)
+        return int(np.argmax(valid)) if valid.any() else -1
 
-    def _findNextSeedPoint(self) -> Union[Vector, None]:
-        for idxStreamline in reversed(range(len(self._streamlines))): # TODO: mark streamlines that have no seedpoint candidates and skip them
 
-            if idxStreamline in self._finishedStreamlineIndexes:
-                continue
+    def _dSepAt(self, pt: Vector) -> float:
+        """
+        private helper, the dSep at a point (the dSep function or the constant dSep)
+        """
+        if self._dSepFunction is None:
+            return self.d_sep
 
-            seedPoint = self._getSeedpoint(idxStreamline)
+        return float(self._dSepFunction(pt))
 
-            if seedPoint is None:
-                self._finishedStreamlineIndexes.append(idxStreamline)
+
+    def _dSepsAt(self, points: np.ndarray) -> np.ndarray:
+        """
+        private helper, the dSep function at the points of an array of shape (N, 2)
+        """
+        return np.array([self._dSepFunction(Vector(x, y)) for x, y in points.tolist()], dtype=np.float64).reshape(-1)
+
+
+    def _initDensity(self, bbox: BoundingBox):
+        """
+        private helper, with a dSep function: d_sep is the smallest dSep sampled over the bbox (the cell size of the
+        grid), d_test defaults to DEFAULT_D_TEST_FACTOR * d_sep
+        """
+        if self._dSepFunction is None:
+            return
+
+        xs = np.linspace(bbox.topLeft.x, bbox.topLeft.x + bbox.width - 1, self.D_SEP_FUNCTION_SAMPLES)
+        ys = np.linspace(bbox.topLeft.y, bbox.topLeft.y + bbox.height - 1, self.D_SEP_FUNCTION_SAMPLES)
+        minDSep = min(float(self._dSepFunction(Vector(x, y))) for x in xs.tolist() for y in ys.tolist())
+        if not minDSep > 0:
+            raise Exception(f'the dSep function must be > 0, got {minDSep}')
+        self.d_sep = minDSep
+        self.d_test = self._dTest if self._dTest is not None else minDSep * self.DEFAULT_D_TEST_FACTOR
+
+
+    def _finishStreamline(self, idxStreamline: int):
+        """
+        private helper, marks a streamline as having no more seed point candidates
+        """
+        self._finishedStreamlineIndexes.add(idxStreamline)
+
+
+    def _currentStreamline(self) -> int:
+        """
+        private helper, the index of the streamline which is searched for the next seed point (depends on seedOrder)
+        """
+        if self._seedOrder == self.SEED_ORDER_FIFO:
+            return self._unfinishedStreamlines[0]
+
+        return self._unfinishedStreamlines[-1]
+
+
+    def _findNextSeedPoint(self) -> Union[Vector, None]:
+        t0 = time.perf_counter() if self._stats is not None else None
+        while self._unfinishedStreamlines:
+            idxStreamline = self._currentStreamline()
+
+            seedPoint = self._getSeedpoint(idxStreamline)
 
             if seedPoint is not None:
+                if t0 is not None:
+                    self._stats.addTime(GeneratorStats.PHASE_SEED_SEARCH, time.perf_counter() - t0)
                 return seedPoint
 
+            # ---- the current streamline is finished, continue with the next one
+            self._finishStreamline(idxStreamline)
+            if self._seedOrder == self.SEED_ORDER_FIFO:
+                self._unfinishedStreamlines.popleft()
+            else:
+                self._unfinishedStreamlines.pop()
+
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_SEED_SEARCH, time.perf_counter() - t0)
         return None # no more seed points found - we are done
 
 
+    def _commitSeedPoints(self, seedPoints: List[Vector], lockStep: bool):
+        """
+        private helper, builds the streamlines of the seed points in their order, seed points which are too near (dSep)
+        to the streamlines before them are skipped. lockStep: all at once (fixed RK4 steps, see _commitLanes()),
+        otherwise one by one with the integrator of the generator
+        """
+        if lockStep:
+            self._commitLanes(seedPoints)
+            return
+
+        for seedPoint in seedPoints:
+            if self._lookupGrid.isPointValid(seedPoint, self._dSepAt(seedPoint)):
+                self._buildStreamline(seedPoint)
+
+
+    def _findSeedpointCandidates(self, maxCandidates: int) -> List[Vector]:
+        """
+        private helper, like _findNextSeedPoint(), but collects the next seed point of up to maxCandidates unfinished
+        streamlines. Candidates which are too near (dSep) to a candidate before them are skipped, their streamline is
+        checked again for the next batch.
+        """
+        t0 = time.perf_counter() if self._stats is not None else None
+        candidates = []
+        candidatesGrid = OccupancyGrid(self.d_sep)
+        if self._seedOrder == self.SEED_ORDER_FIFO:
+            unfinishedStreamlines = list(self._unfinishedStreamlines)
+        else:
+            unfinishedStreamlines = list(reversed(self._unfinishedStreamlines))
+
+        for idxStreamline in unfinishedStreamlines:
+
+            seedPoint = self._getSeedpoint(idxStreamline)
+
+            if seedPoint is None:
+                self._finishStreamline(idxStreamline)
+                continue
+
+            if candidatesGrid.hasPointWithin(seedPoint, self.d_sep):
+                continue # too near to another candidate of this batch
+
+            candidates.append(seedPoint)
+            candidatesGrid.addSamplePoint(seedPoint)
+            if len(candidates) >= maxCandidates:
+                break
+
+        self._unfinishedStreamlines = deque(idx for idx in self._unfinishedStreamlines if idx not in self._finishedStreamlineIndexes)
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_SEED_SEARCH, time.perf_counter() - t0)
+        return candidates
+
+
+    def getStreamlineSpeeds(self) -> List[np.ndarray]:
+        """
+        the length of the (not normalized) velocity at each point of the streamlines of the last build, NaN where the
+        field is not defined. Recorded while building, e.g. for coloring the streamlines by velocity.
+        """
+        return [self._streamlines.speeds(idx) for idx in range(len(self._streamlines))]
+
+
+    def getSeedPoints(self) -> List[Vector]:
+        """
+        the seed point of each streamline of the last build, e.g. for the next frame of an animation (see
+        buildStreamlinesFromPrevious())
+        """
+        return self._seedPoints
+
+
+    def getStats(self) -> Union[GeneratorStats, None]:
+        """
+        the counters and timers of the last build (see GeneratorStats), None if the generator was created without collectStats
+        """
+        return self._stats
+
+
+    def setProgressCallback(self, progressCallback: Callable):
+        """
+        progressCallback(index, streamline, stats) is called for each new streamline, see iterStreamlines()
+        pass None to remove it
+        """
+        self._progressCallback = progressCallback
+
+
+    def setCheckpoint(self, path: Union[str, None], interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        while the domain is filled, a checkpoint is written to path (.npz, see saveCheckpoint()) every interval seconds,
+        so a long build which was killed can be continued with buildStreamlinesFromCheckpoint()
+        pass None to disable it
+        """
+        self._checkpointPath = path
+        self._checkpointInterval = interval
+
+
+    def saveCheckpoint(self, path: str):
+        """
+        writes the state of the current build to path (.npz): the streamlines (StreamlineCollection.toArrays()), their
+        seed points, the seed point search (cursors, finished and unfinished streamlines) and the config (including the
+        class names of the grid backend and the integrator, and the dSep mode).
+        Can be called between two streamlines, e.g. in the progress callback or in the loop over iterStreamlines().
+        The file is replaced atomically, a killed write leaves the previous checkpoint intact.
+        """
+        numStreamlines = len(self._streamlines)
+        finished = np.zeros(numStreamlines, dtype=bool)
+        finished[list(self._finishedStreamlineIndexes)] = True
+        tmpPath = path + '.tmp'
+        with open(tmpPath, 'wb') as f:
+            np.savez(f,
+                     version=np.array(self.CHECKPOINT_VERSION),
+                     config=np.array([self.d_sep, self.d_test, self._stepSize, self._seedOrder, self._seedBatchSize], dtype=np.float64),
+                     setup=np.array(self._checkpointSetup()),
+                     bbox=np.array([self._bbox.topLeft.x, self._bbox.topLeft.y, self._bbox.width, self._bbox.height], dtype=np.float64),
+                     seedPoints=np.array([pt.asTuple() for pt in self._seedPoints], dtype=np.float64).reshape(-1, 2),
+                     seedCursors=np.array(self._seedCursors, dtype=np.int64),
+                     finished=finished,
+                     unfinished=np.array(self._unfinishedStreamlines, dtype=np.int64),
+                     **self._streamlines.toArrays())
+        os.replace(tmpPath, path)
+        self._lastCheckpointTime = time.perf_counter()
+        logger.info("checkpoint of %d streamlines written to %s", numStreamlines, path)
+
+
+    def _maybeSaveCheckpoint(self):
+        """
+        private helper, writes a checkpoint if one is due (see setCheckpoint())
+        """
+        if self._checkpointPath is not None and time.perf_counter() - self._lastCheckpointTime >= self._checkpointInterval:
+            self.saveCheckpoint(self._checkpointPath)
+
+
+    def _checkpointSetup(self) -> List[str]:
+        """
+        private helper, the class names of the grid backend and the integrator (none: the default RK4 steps) and the
+        dSep mode (constant or function) of a checkpoint, a resumed build with another one would differ
+        """
+        return [self._lookupGridClass.__name__,
+                'none' if self._integrator is None else type(self._integrator).__name__,
+                'constant' if self._dSepFunction is None else 'function']
+
+
+    def _loadCheckpoint(self, path: str):
+        """
+        private helper, restores the state of a build from a checkpoint (see saveCheckpoint()), the grid is rebuilt by
+        bulk insertion of all points
+        """
+        with np.load(path) as checkpoint:
+            arrays = {key: checkpoint[key] for key in checkpoint.files}
+
+        if int(arrays['version']) != self.CHECKPOINT_VERSION:
+            raise Exception(f"{path}: checkpoint version {int(arrays['version'])} is not supported")
+
+        x, y, width, height = arrays['bbox'].tolist()
+        self._initObjects(BoundingBox(x, y, width, height))
+        config = [self.d_sep, self.d_test, self._stepSize, self._seedOrder, self._seedBatchSize]
+        if arrays['config'].tolist() != [float(value) for value in config]:
+            raise Exception(f"{path}: the checkpoint was written with another config (dSep, dTest, stepSize, seedOrder, seedBatchSize): "
+                            f"{arrays['config'].tolist()}, expected {config}")
+        if arrays['setup'].tolist() != self._checkpointSetup():
+            raise Exception(f"{path}: the checkpoint was written with another setup (grid, integrator, dSep mode): "
+                            f"{arrays['setup'].tolist()}, expected {self._checkpointSetup()}")
+        self._streamlines = StreamlineCollection.fromArrays(arrays['coords'], arrays['offsets'], arrays['directions'], arrays['speeds'])
+        self._seedPoints = [Vector(x, y) for x, y in arrays['seedPoints'].tolist()]
+        self._seedCursors = arrays['seedCursors'].tolist()
+        self._finishedStreamlineIndexes = set(np.flatnonzero(arrays['finished']).tolist())
+        self._unfinishedStreamlines = deque(arrays['unfinished'].tolist())
+
+        # ---- bulk insertion, the order of the points does not change the result of the grid queries
+        t0 = time.perf_counter() if self._stats is not None else None
+        if hasattr(self._lookupGrid, 'addPoints'):
+            self._lookupGrid.addPoints(self._streamlines.coords)
+        else:
+            self._lookupGrid.addStreamline([Vector(x, y) for x, y in self._streamlines.coords.tolist()])
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_GRID_INSERTION, time.perf_counter() - t0)
+        logger.info("%d streamlines restored from checkpoint %s", len(self._streamlines), path)
+
+
     def setStepSize(self, stepSize: float):
         """
         default stepSize is 1.0
@@ -92,27 +488,378 @@ class StreamlineGenerator:
 
 
 
-    def buildStreamlines(self, bbox: BoundingBox, initialStreamline: Vector) -> List[List[Vector]]:
+    def _initObjects(self, bbox: BoundingBox):
         """
-        the main function
+        private helper
         """
-        # ---- init objects
-        self._lookupGrid = LookupGrid(bbox, self.d_sep)
-        self._streamlines = []
-        self._finishedStreamlineIndexes = []
-        streamlineIntegrator = StreamlineIntegrator(self.vectorFieldNormalized, self._lookupGrid, self._stepSize, self.d_test)
+        self._bbox = bbox
+        self._initDensity(bbox)
+        self._lookupGrid = self._lookupGridClass(bbox, self.d_sep)
+        self._streamlines = StreamlineCollection()
+        self._finishedStreamlineIndexes = set()
+        self._unfinishedStreamlines = deque()
+        self._seedCursors = []
+        self._seedPoints = []
+        self._numSamplePoints = 0
+        self._startTime = time.perf_counter()
+        self._lastCheckpointTime = self._startTime
+        self._streamlineIntegrator = StreamlineIntegrator(self.vectorFieldNormalized, self._lookupGrid, self._stepSize, self.d_test,
+                                                          self.sampleVectorField, self._integrator)
+        self._batchIntegrator = BatchStreamlineIntegrator(self.vectorFieldNormalizedBatch, self._lookupGrid, self._stepSize, self.d_test,
+                                                          self.sampleVectorFieldBatch)
+        self._stats = GeneratorStats() if self._collectStats else None
+        if self._stats is not None:
+            self._lookupGrid.stats = self._stats
+            self._streamlineIntegrator.stats = self._stats
+            self._batchIntegrator.stats = self._stats
+
+
+    def _addStreamline(self, sl: List[Vector], samples: List[Tuple[Vector, Vector]], seedPoint: Vector):
+        """
+        private helper
+        samples: (velocity, direction) at the points of the streamline
+        """
+        t0 = time.perf_counter() if self._stats is not None else None
+        self._lookupGrid.addStreamline(sl)
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_GRID_INSERTION, time.perf_counter() - t0)
+        self._unfinishedStreamlines.append(len(self._streamlines))
+        self._seedCursors.append(0)
+        self._seedPoints.append(seedPoint)
+        self._streamlines.append(
+            np.array([pt.asTuple() for pt in sl], dtype=np.float64).reshape(-1, 2),
+            np.array([(math.nan, math.nan) if direction is None else direction.asTuple() for _, direction in samples], dtype=np.float64).reshape(-1, 2),
+            np.array([math.nan if velocity is None else velocity.length() for velocity, _ in samples], dtype=np.float64)
+        )
+
+
+    def _addStreamlineArrays(self, coords: np.ndarray, directions: np.ndarray, speeds: np.ndarray, seedPoint: Vector = None):
+        """
+        private helper, like _addStreamline(), for a streamline given as arrays (see StreamlineCollection)
+        the seed point defaults to the middle point of the streamline
+        """
+        t0 = time.perf_counter() if self._stats is not None else None
+        if hasattr(self._lookupGrid, 'addPoints'):
+            self._lookupGrid.addPoints(coords)
+        else:
+            self._lookupGrid.addStreamline([Vector(x, y) for x, y in coords.tolist()])
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_GRID_INSERTION, time.perf_counter() - t0)
+        self._unfinishedStreamlines.append(len(self._streamlines))
+        self._seedCursors.append(0)
+        if seedPoint is None:
+            x, y = coords[len(coords) // 2].tolist()
+            seedPoint = Vector(x, y)
+        self._seedPoints.append(seedPoint)
+        self._streamlines.append(coords, directions, speeds)
+
+
+    def _buildStreamline(self, seedPoint: Vector):
+        """
+        private helper, builds a single streamline and adds it
+        """
+        t0 = time.perf_counter() if self._stats is not None else None
+        sl = self._streamlineIntegrator.buildStreamline(seedPoint)
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_INTEGRATION, time.perf_counter() - t0)
+        self._addStreamline(sl, list(zip(self._streamlineIntegrator.streamlineVelocities, self._streamlineIntegrator.streamlineDirections)), seedPoint)
 
-        # ---- initial streamline
-        seedPoint = initialStreamline
+
+    def _numValidPoints(self, points: List[Vector]) -> int:
+        """
+        private helper, returns the number of leading points which are valid (dTest) in the current grid
+        """
+        if not points:
+            return 0
+        valid = self._lookupGrid.arePointsValid(np.array([pt.asTuple() for pt in points], dtype=np.float64), self.d_test)
+
+        return len(points) if valid.all() else int(np.argmin(valid))
+
+
+    def _commitLanes(self, seedPoints: List[Vector]):
+        """
+        private helper, integrates all seed points at once and adds the resulting streamlines to the grid, in order.
+
+        The lanes were integrated against the grid as it was before this batch, so each lane is truncated at its first
+        point which is too near to the lanes committed before it. The result is the same as if the streamline had been
+        built (sequentially) after these lanes: the path of a streamline only depends on its seed point, the grid
+        only decides where it ends.
+        """
+        t0 = time.perf_counter() if self._stats is not None else None
+        lanes = self._batchIntegrator.buildStreamlines(seedPoints)
+        if t0 is not None:
+            self._stats.addTime(GeneratorStats.PHASE_INTEGRATION, time.perf_counter() - t0)
+        for idxLane, seedPoint in enumerate(seedPoints):
+            if not self._lookupGrid.isPointValid(seedPoint, self._dSepAt(seedPoint)):
+                continue # no longer a valid seed point
+
+            forwardPoints = self._batchIntegrator.forwardPoints[idxLane]
+            backwardPoints = self._batchIntegrator.backwardPoints[idxLane]
+            numForward = self._numValidPoints(forwardPoints)
+            numBackward = self._numValidPoints(backwardPoints)
+            if numForward == len(forwardPoints) and numBackward == len(backwardPoints):
+                self._addStreamline(lanes[idxLane], self._batchIntegrator.streamlineSamples(idxLane), seedPoint)
+            elif numForward < len(forwardPoints) and self._batchIntegrator.backwardStopReasons[idxLane] == BatchStreamlineIntegrator.SELF_HIT:
+                # the backward part may have stopped at one of the truncated forward points, build it again
+                self._buildStreamline(seedPoint)
+            else:
+                sl = backwardPoints[:numBackward][::-1] + [seedPoint] + forwardPoints[:numForward]
+                samples = self._batchIntegrator.backwardSamples[idxLane][:numBackward][::-1] + \
+                          [self._batchIntegrator.seedSamples[idxLane]] + \
+                          self._batchIntegrator.forwardSamples[idxLane][:numForward]
+                self._addStreamline(sl, samples, seedPoint)
+
+
+    def _iterFillDomain(self) -> Iterator[int]:
+        """
+        private helper, adds streamlines until no more seed points are found
+        yields the index of each new streamline as soon as it is added
+        """
+        if self._seedBatchSize > 1:
+            seedPoints = self._findSeedpointCandidates(self._seedBatchSize)
+            while seedPoints:
+                logger.debug("batch of %d seed points", len(seedPoints))
+                numStreamlines = len(self._streamlines)
+                self._commitLanes(seedPoints)
+                self._maybeSaveCheckpoint()
+                yield from range(numStreamlines, len(self._streamlines))
+                seedPoints = self._findSeedpointCandidates(self._seedBatchSize)
+            return
+
+        # ---- find next seed point
+        seedPoint = self._findNextSeedPoint()
         while seedPoint is not None:
-            print(f"streamlineIntegrator.buildStreamline...{seedPoint}")
-            sl = streamlineIntegrator.buildStreamline(seedPoint)
-            self._lookupGrid.addStreamline(sl)
-            self._streamlines.append(sl)
-            #print(f"streamline: {sl}\n---------------------------------\n")
+            logger.debug("streamlineIntegrator.buildStreamline...%s", seedPoint)
+            self._buildStreamline(seedPoint)
+            self._maybeSaveCheckpoint()
+            yield len(self._streamlines) - 1
 
             # ---- find next seed point
             seedPoint = self._findNextSeedPoint()
-            print(f"next seed point: {seedPoint}")
 
-        return self._streamlines
\ No newline at end of file
+
+    def _report(self, idxStreamline: int) -> Tuple[int, np.ndarray, dict]:
+        """
+        private helper, collects the statistics of a new streamline and passes them to the progress callback
+        """
+        streamline = self._streamlines[idxStreamline]
+        self._numSamplePoints += len(streamline)
+        stats = {
+            'numPoints': len(streamline), # of this streamline
+            'numStreamlines': len(self._streamlines), # so far
+            'numSamplePoints': self._numSamplePoints, # so far, of all streamlines
+            'elapsed': time.perf_counter() - self._startTime, # seconds since the build was started
+        }
+        if self._progressCallback is not None:
+            self._progressCallback(idxStreamline, streamline, stats)
+
+        return idxStreamline, streamline, stats
+
+
+    def iterStreamlines(self, bbox: BoundingBox, initialStreamline: Vector) -> Iterator[Tuple[int, np.ndarray, dict]]:
+        """
+        like buildStreamlines(), but yields (index, streamline, stats) for each streamline as soon as it is added to the
+        grid, so the output can be written while the generation continues.
+        streamline is a (zero-copy) array of shape (N, 2), see StreamlineCollection.
+        stats is a dict with numPoints, numStreamlines, numSamplePoints and elapsed (seconds)
+        """
+        # ---- init objects
+        self._initObjects(bbox)
+
+        # ---- initial streamline
+        logger.debug("streamlineIntegrator.buildStreamline...%s", initialStreamline)
+        self._buildStreamline(initialStreamline)
+        yield self._report(0)
+
+        for idxStreamline in self._iterFillDomain():
+            yield self._report(idxStreamline)
+
+
+    def iterStreamlinesFromSeeds(self, bbox: BoundingBox, seedPoints: List[Vector]) -> Iterator[Tuple[int, np.ndarray, dict]]:
+        """
+        like buildStreamlinesFromSeeds(), but yields (index, streamline, stats), see iterStreamlines()
+        """
+        # ---- init objects
+        self._initObjects(bbox)
+
+        # ---- initial streamlines
+        self._commitSeedPoints(seedPoints, self._integrator is None)
+        for idxStreamline in range(len(self._streamlines)):
+            yield self._report(idxStreamline)
+
+        for idxStreamline in self._iterFillDomain():
+            yield self._report(idxStreamline)
+
+
+    def iterStreamlinesFromStreamlines(self, bbox: BoundingBox, streamlines: StreamlineCollection,
+                                       searchIndexes: Iterable[int] = None) -> Iterator[Tuple[int, np.ndarray, dict]]:
+        """
+        like iterStreamlines(), but starts with existing streamlines (e.g. the merged tiles of TiledStreamlineGenerator),
+        they are added to the grid as they are and yielded first. Then the domain is filled: seed points are searched
+        next to the streamlines of searchIndexes (default: all of them) and next to the new streamlines.
+        The existing streamlines should already be dTest apart.
+        """
+        # ---- init objects
+        self._initObjects(bbox)
+
+        # ---- existing streamlines, the directions which were not recorded are sampled
+        for idxStreamline in range(len(streamlines)):
+            coords = streamlines[idxStreamline]
+            directions = streamlines.directions(idxStreamline)
+            missing = np.isnan(directions).any(axis=1)
+            if missing.any():
+                directions = directions.copy()
+                directions[missing] = self.vectorFieldNormalizedBatch(coords[missing])
+            self._addStreamlineArrays(coords, directions, streamlines.speeds(idxStreamline))
+
+        if searchIndexes is not None:
+            searchIndexes = set(searchIndexes)
+            for idxStreamline in range(len(streamlines)):
+                if idxStreamline not in searchIndexes:
+                    self._finishStreamline(idxStreamline)
+            self._unfinishedStreamlines = deque(idx for idx in self._unfinishedStreamlines if idx in searchIndexes)
+
+        for idxStreamline in range(len(self._streamlines)):
+            yield self._report(idxStreamline)
+
+        for idxStreamline in self._iterFillDomain():
+            yield self._report(idxStreamline)
+
+
+    def iterStreamlinesFromPrevious(self, bbox: BoundingBox, previous: StreamlineCollection, previousSeedPoints: List[Vector],
+                                    tolerance: float = DEFAULT_REUSE_TOLERANCE) -> Iterator[Tuple[int, np.ndarray, dict]]:
+        """
+        like iterStreamlines(), but for the next frame of an animation: starts with the streamlines of the previous
+        frame (built with a previous version of the field, on the same bbox), see buildStreamlinesFromPrevious()
+        """
+        if self._dSepFunction is not None:
+            raise Exception('buildStreamlinesFromPrevious() is not supported with a dSep function')
+
+        # ---- init objects
+        self._initObjects(bbox)
+
+        # ---- which of the previous streamlines still follow the field: the directions at all of their points are
+        #      (nearly) unchanged. The field is evaluated in bulk.
+        arrays = previous.toArrays()
+        offsets = arrays['offsets']
+        velocities, directions = self.sampleVectorFieldBatch(arrays['coords'])
+        speeds = self._lengths(velocities)
+        deviations = np.abs(directions - arrays['directions']).max(axis=1)
+        bothSingular = np.isnan(directions).any(axis=1) & np.isnan(arrays['directions']).any(axis=1)
+        deviations[bothSingular] = 0.0
+        deviations[np.isnan(deviations)] = np.inf # singular in one of the fields only
+        unchanged = np.maximum.reduceat(deviations, offsets[:-1]) <= tolerance if len(previous) > 0 else np.zeros(0, dtype=bool)
+
+        # ---- 1. keep the unchanged streamlines as they are
+        for idxPrevious in np.flatnonzero(unchanged).tolist():
+            start, end = offsets[idxPrevious], offsets[idxPrevious + 1]
+            self._addStreamlineArrays(previous[idxPrevious], directions[start:end], speeds[start:end], previousSeedPoints[idxPrevious])
+        numKept = len(self._streamlines)
+
+        # ---- 2. integrate the changed streamlines again, from their seed points (dropped if too near to another streamline)
+        changedSeedPoints = [previousSeedPoints[idxPrevious] for idxPrevious in np.flatnonzero(~unchanged).tolist()]
+        self._commitSeedPoints(changedSeedPoints, self._seedBatchSize > 1)
+        logger.info("%d of %d streamlines kept, %d integrated again", numKept, len(previous), len(self._streamlines) - numKept)
+
+        # ---- seed points are only searched near the changes: the seed point candidates of a kept streamline were all
+        #      rejected in the previous frame, by points within 2 * dSep, which are still there unless they changed
+        changesGrid = ArrayLookupGrid(bbox, 2 * self.d_sep)
+        changesGrid.addPoints(arrays['coords'][np.repeat(~unchanged, np.diff(offsets))])
+        changesGrid.addPoints(self._streamlines.coords[self._streamlines.offsets[numKept]:])
+        for idxStreamline in range(numKept):
+            if changesGrid.arePointsValid(self._streamlines[idxStreamline], 2 * self.d_sep).all():
+                self._finishStreamline(idxStreamline)
+        self._unfinishedStreamlines = deque(idx for idx in self._unfinishedStreamlines if idx not in self._finishedStreamlineIndexes)
+
+        for idxStreamline in range(len(self._streamlines)):
+            yield self._report(idxStreamline)
+
+        # ---- 3. fill the gaps
+        for idxStreamline in self._iterFillDomain():
+            yield self._report(idxStreamline)
+
+
+    def iterStreamlinesFromCheckpoint(self, path: str) -> Iterator[Tuple[int, np.ndarray, dict]]:
+        """
+        like buildStreamlinesFromCheckpoint(), but yields (index, streamline, stats), see iterStreamlines().
+        The restored streamlines are yielded first.
+        """
+        self._loadCheckpoint(path)
+
+        for idxStreamline in range(len(self._streamlines)):
+            yield self._report(idxStreamline)
+
+        for idxStreamline in self._iterFillDomain():
+            yield self._report(idxStreamline)
+
+
+    def buildStreamlines(self, bbox: BoundingBox, initialStreamline: Vector, compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        the main function
+        compact: if True, the streamlines are returned as StreamlineCollection (one flat array of all points, no Vector
+                 objects), otherwise as lists of Vectors
+        """
+        for _ in self.iterStreamlines(bbox, initialStreamline):
+            pass
+
+        logger.info("%d streamlines generated", len(self._streamlines))
+        return self._streamlines if compact else self._streamlines.toVectorLists()
+
+
+    def buildStreamlinesFromSeeds(self, bbox: BoundingBox, seedPoints: List[Vector], compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        like buildStreamlines(), but starts with a set of seed points which are integrated at once (lock-step, fixed RK4
+        steps), or one by one if an integrator was passed to the constructor.
+        Seed points which are too near (dSep) to the streamlines of the seed points before them are skipped.
+        """
+        for _ in self.iterStreamlinesFromSeeds(bbox, seedPoints):
+            pass
+
+        logger.info("%d streamlines generated", len(self._streamlines))
+        return self._streamlines if compact else self._streamlines.toVectorLists()
+
+
+    def buildStreamlinesFromStreamlines(self, bbox: BoundingBox, streamlines: StreamlineCollection, searchIndexes: Iterable[int] = None,
+                                        compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        like buildStreamlines(), but starts with existing streamlines, see iterStreamlinesFromStreamlines()
+        """
+        for _ in self.iterStreamlinesFromStreamlines(bbox, streamlines, searchIndexes):
+            pass
+
+        logger.info("%d streamlines generated", len(self._streamlines))
+        return self._streamlines if compact else self._streamlines.toVectorLists()
+
+
+    def buildStreamlinesFromPrevious(self, bbox: BoundingBox, previous: StreamlineCollection, previousSeedPoints: List[Vector],
+                                     tolerance: float = DEFAULT_REUSE_TOLERANCE, compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        incremental version of buildStreamlines() for animations, where the field changes a little from frame to frame.
+        previous: the streamlines of the previous frame (buildStreamlines(.., compact=True))
+        previousSeedPoints: their seed points (getSeedPoints() of the previous frame)
+        tolerance: max. change of the normalized velocity at the points of a streamline to keep it as it is
+
+        1. the previous streamlines which still follow the field are kept (unchanged, so they do not flicker)
+        2. the others are integrated again from their seed points, in their order. They are dropped if their seed point
+           is too near (dSep) to another streamline now.
+        3. the gaps are filled, seed points are only searched near the streamlines which changed
+        So the costs depend on how much of the field changed, not on the size of the bbox.
+        """
+        for _ in self.iterStreamlinesFromPrevious(bbox, previous, previousSeedPoints, tolerance):
+            pass
+
+        logger.info("%d streamlines generated", len(self._streamlines))
+        return self._streamlines if compact else self._streamlines.toVectorLists()
+
+
+    def buildStreamlinesFromCheckpoint(self, path: str, compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        continues a build from a checkpoint (see setCheckpoint() / saveCheckpoint()). The generator must be created with
+        the same flow field and config (dSep, dTest, stepSize, seedOrder, seedBatchSize, grid backend, integrator and
+        dSep mode), the bbox is read from the checkpoint. The result is the same as the one of the build without interruption.
+        """
+        for _ in self.iterStreamlinesFromCheckpoint(path):
+            pass
+
+        logger.info("%d streamlines generated", len(self._streamlines))
+        return self._streamlines if compact else self._streamlines.toVectorLists()
@@ -1,11 +1,13 @@
 import math
-from typing import List,Union
+from typing import List, Tuple, Union
 import numpy as np
 import typing
 
+from GeneratorStats import GeneratorStats
 from LookupGrid import LookupGrid
+from OccupancyGrid import OccupancyGrid
 from Vector import Vector
-from rk4 import rk4
+from Rk4Integrator import Rk4Integrator
 
 
 def isSame(a: float, b: float) -> bool:
@@ -36,13 +38,32 @@ class StreamlineIntegrator:
                  grid: LookupGrid,
                  stepSize: float,  # from config TODO: default to 1.0 and add method setStepSize()
                  # dSep: float,
-                 dTest: float # needed to decide when to end streamline "integration"
+                 dTest: float, # needed to decide when to end streamline "integration"
+                 sampleVectorField: typing.Callable = None, # optional, returns (velocity, normalized velocity) at passed coords
+                 integrator = None # optional, Rk4Integrator (default) or DormandPrinceIntegrator
     ):
+        """
+        if sampleVectorField is passed, the (raw) velocities at the points of the streamline are recorded too
+        (streamlineVelocities, streamlineSpeeds). It replaces the first RK4 stage, so no extra field evaluations are needed.
+        """
         #self.vectorField: typing.Callable = vectorField
         self.vectorFieldNormalized: typing.Callable = vectorFieldNormalized
+        self.integrator = Rk4Integrator() if integrator is None else integrator
+        self.sampleVectorField: typing.Callable = sampleVectorField
         self.grid: LookupGrid = grid
         self.stepSize: float = stepSize # from config
         self.streamlinePoints: List[Vector] = None
+        self._forwardPoints: List[Vector] = None # start point + points grown forward, in order
+        self._backwardPoints: List[Vector] = None # points grown backward, in reverse order (nearest to start first)
+        self._occupancyGrid: OccupancyGrid = None # points of the current streamline, for the self-intersection check
+        self.stats: GeneratorStats = None # optional, counts the steps and why streamlines end (set by StreamlineGenerator)
+
+        # ---- per point of the streamline, in the same order as streamlinePoints
+        self.streamlineVelocities: List[Union[Vector, None]] = None # the velocity (not normalized), None if not known
+        self.streamlineDirections: List[Union[Vector, None]] = None # the normalized velocity, None at a singularity
+        self.streamlineSpeeds: List[float] = None # length of the velocity, NaN if not known
+        self._forwardSamples: List[Tuple[Vector, Vector]] = None # (velocity, direction) at the _forwardPoints
+        self._backwardSamples: List[Tuple[Vector, Vector]] = None # (velocity, direction) at the _backwardPoints
 
         # streamlinePoints: List[Vector] = None # aka theResult aka streamline aka points
         self.pos: Vector = None # TODO: remove. pass pos to the functions which need it
@@ -59,48 +80,88 @@ class StreamlineIntegrator:
         """
 
         # ---- add first point
-        self.streamlinePoints = [start] # aka theResult aka streamline aka points
+        # both buffers are append-only, they are joined when the streamline is done
+        self._forwardPoints = [start]
+        self._backwardPoints = []
+        self._forwardSamples = []
+        self._backwardSamples = []
+        self._occupancyGrid = OccupancyGrid(abs(self.stepSize))
+        self._occupancyGrid.addSamplePoint(start)
         self.pos = start
         state = self.FORWARD # FORWARD / BACKWARD / DONE (TODO: rename?)
+        self.integrator.begin(start, self.stepSize, self.vectorFieldNormalized)
 
         # ---- add points to the streamline
         while state != self.DONE:
             # print(f".{state}", end='')
             # -- forward
             if state == self.FORWARD:
-                point = self._grow(self.stepSize)
+                sample = self._sample(self.pos)
+                self._forwardSamples.append(sample)
+                point = self._grow(self.stepSize, sample[1])
                 if point is not None:
-                    self.streamlinePoints.append(point)
+                    self._forwardPoints.append(point)
+                    self._occupancyGrid.addSamplePoint(point)
                     self.pos = point
                 else:
                     # Reset self.position to start, and grow backwards:
                     self.pos = start
                     state = self.BACKWARD
+                    self.integrator.begin(start, -self.stepSize, self.vectorFieldNormalized)
 
             # -- backward
             if state == self.BACKWARD:
-                point = self._grow(-self.stepSize)
+                if self._backwardPoints:
+                    sample = self._sample(self.pos)
+                    self._backwardSamples.append(sample)
+                else:
+                    sample = self._forwardSamples[0] # the start point was already sampled when growing forward
+                point = self._grow(-self.stepSize, sample[1])
                 if point is not None:
-                    self.streamlinePoints.insert(0, point)
+                    self._backwardPoints.append(point)
+                    self._occupancyGrid.addSamplePoint(point)
                     self.pos = point
                 else:
                     state = self.DONE
 
+        # ---- join the buffers
+        self._backwardPoints.reverse()
+        self._backwardSamples.reverse()
+        self.streamlinePoints = self._backwardPoints + self._forwardPoints # aka theResult aka streamline aka points
+        samples = self._backwardSamples + self._forwardSamples
+        self.streamlineVelocities = [velocity for velocity, _ in samples]
+        self.streamlineDirections = [direction for _, direction in samples]
+        self.streamlineSpeeds = [math.nan if velocity is None else velocity.length() for velocity in self.streamlineVelocities]
+
         return self.streamlinePoints
 
 
 
+    def _sample(self, pos: Vector) -> Tuple[Union[Vector, None], Union[Vector, None]]:
+        """
+        private helper, returns (velocity, direction) at pos
+        """
+        if self.sampleVectorField is not None:
+            return self.sampleVectorField(pos)
+
+        return None, self.vectorFieldNormalized(pos)
+
+
+
 
-    def _grow(self, stepSize: float) -> Union[Vector, None]:
+    def _grow(self, stepSize: float, direction: Union[Vector, None]) -> Union[Vector, None]:
         """
         private helper
+        direction is the normalized velocity at self.pos (the first RK4 stage)
         """
         #print("_growForward")
-        velocity = rk4(self.pos, stepSize, self.vectorFieldNormalized)
+        if direction is None:
+            return self._reject(GeneratorStats.REJECTED_SINGULARITY) # Hit the singularity.
+        velocity = self.integrator.step(self.pos, stepSize, self.vectorFieldNormalized, direction)
         #print(f"gf:{velocity}", end="")
         if velocity is None or velocity.hasZeroLength(1e-8):
             # print(f"singulariy 1: {velocity}")
-            return None # Hit the singularity.
+            return self._reject(GeneratorStats.REJECTED_SINGULARITY) # Hit the singularity.
         # print("-")
 
         candidate: Vector = self.pos + velocity
@@ -110,14 +171,27 @@ class StreamlineIntegrator:
         #     return None
 
         # ---- did we hit our current streamlinePoints (hack to avoid infinite ping-pong)?
-        for existingPt in self.streamlinePoints:
-            if existingPt.distanceTo(candidate) <= abs(stepSize) * self.STEP_SIZE_FACTOR_TERMINATION_CONDITION:
-                return None
+        if self._occupancyGrid.hasPointWithin(candidate, abs(stepSize) * self.STEP_SIZE_FACTOR_TERMINATION_CONDITION):
+            return self._reject(GeneratorStats.REJECTED_SELF_HIT)
 
         # ---- is point not too near to some of the previous existing streamlines, then it is valid point
         if self.grid.isPointValid(candidate, self.dTest):
+            if self.stats is not None:
+                self.stats.numSteps += 1
             return candidate
 
+        if self.stats is not None:
+            self.stats.reject(GeneratorStats.REJECTED_OUT_OF_BOUNDS if self.grid._isOutside(candidate) else GeneratorStats.REJECTED_D_TEST)
+        return None
+
+
+    def _reject(self, reason: str) -> None:
+        """
+        private helper, ends the streamline (in the current direction), counts the reason if stats are collected
+        """
+        if self.stats is not None:
+            self.stats.reject(reason)
+
         return None
 
 
@@ -0,0 +1,134 @@
+from typing import IO, List, Union
+
+import numpy as np
+
+from BoundingBox import BoundingBox
+from Vector import Vector
+from colorMap import velocityColors
+
+
+class SvgWriter:
+    """
+    writes streamlines to a svg file while they come in (e.g. from StreamlineGenerator.iterStreamlines()), nothing but
+    the currently open color buckets is kept in memory.
+
+    - monochrome streamlines are written as one <polyline> each (addPolyline())
+    - color encoded streamlines (addColoredStreamline()) are split into runs of segments with the same (quantized) color,
+      the runs of all streamlines with the same color are collected in one <path> per color bucket. A bucket is written
+      when its path data gets longer than flushSize (and on close()), so there are far fewer elements than segments.
+    - numbers are written with a fixed number of decimals (precision)
+
+    usage:
+        with SvgWriter('out.svg', bbox) as writer:
+            for idx, streamline, stats in generator.iterStreamlines(bbox, seedPoint):
+                writer.addPolyline(streamline)
+    """
+
+    DEFAULT_NUM_COLORS = 64
+
+    def __init__(self, fileOrPath: Union[str, IO], bbox: BoundingBox, background: str = 'white', precision: int = 2,
+                 numColors: int = DEFAULT_NUM_COLORS, strokeWidth: str = '1px', flushSize: int = 1 << 16):
+        """
+        fileOrPath: the path of the svg file or a (text) file handle, a file handle is not closed by close()
+        background: fill color of the background rect, None for no background
+        numColors: number of color buckets of addColoredStreamline()
+        """
+        self._ownsFile: bool = isinstance(fileOrPath, str)
+        self._file: IO = open(fileOrPath, 'w') if self._ownsFile else fileOrPath
+        self._precision: int = precision
+        self._numColors: int = numColors
+        self._flushSize: int = flushSize
+        # ---- the color of each bucket is the color at the center of its value range
+        colors = np.rint(velocityColors((np.arange(numColors) + 0.5) / numColors)).astype(int)
+        self._bucketColors: List[str] = ['#%02x%02x%02x' % tuple(color) for color in colors]
+        self._buckets: List[List[str]] = [[] for _ in range(numColors)] # path data (subpaths) per color bucket
+        self._bucketSizes: List[int] = [0] * numColors
+
+        self._file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{bbox.width}" height="{bbox.height}" '
+                         f'viewBox="{bbox.topLeft.x} {bbox.topLeft.y} {bbox.width} {bbox.height}">\n')
+        if background is not None:
+            self._file.write(f'<rect x="{bbox.topLeft.x}" y="{bbox.topLeft.y}" width="100%" height="100%" fill="{background}" stroke="none"/>\n')
+        self._file.write(f'<g fill="none" stroke-width="{strokeWidth}" stroke-linecap="round" stroke-linejoin="round">\n')
+
+    def __enter__(self) -> "SvgWriter":
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def addPolyline(self, streamline: Union[np.ndarray, List[Vector]], stroke: str = 'blue'):
+        """
+        streamline: array of shape (N, 2) (see StreamlineCollection) or list of Vectors
+        """
+        coords = _asCoords(streamline)
+        if len(coords) < 2:
+            return
+
+        self._file.write(f'<polyline stroke="{stroke}" points="{" ".join(self._formatPoints(coords, ","))}"/>\n')
+
+    def addColoredStreamline(self, streamline: Union[np.ndarray, List[Vector]], values01: np.ndarray):
+        """
+        values01: per point of the streamline a value in [0..1] (e.g. the normalized speed, see colorMap.normalizeSpeeds()),
+                  the color of a segment is the color of the mean value of its 2 points, NaN counts as 0
+        """
+        coords = _asCoords(streamline)
+        if len(coords) < 2:
+            return
+
+        values = np.asarray(values01, dtype=np.float64)
+        segmentValues = np.nan_to_num((values[:-1] + values[1:]) / 2.0, nan=0.0)
+        buckets = np.clip((segmentValues * self._numColors).astype(int), 0, self._numColors - 1)
+        points = self._formatPoints(coords, " ")
+
+        # ---- runs of segments with the same color bucket, the run [start, end) has the points start .. end
+        runStarts = [0] + (np.flatnonzero(np.diff(buckets)) + 1).tolist()
+        runEnds = runStarts[1:] + [len(buckets)]
+        for start, end in zip(runStarts, runEnds):
+            idxBucket = int(buckets[start])
+            subpath = f'M{points[start]}L{" ".join(points[start + 1:end + 1])}'
+            self._buckets[idxBucket].append(subpath)
+            self._bucketSizes[idxBucket] += len(subpath)
+            if self._bucketSizes[idxBucket] > self._flushSize:
+                self._flushBucket(idxBucket)
+
+    def close(self):
+        """
+        writes the open color buckets and the end of the svg
+        """
+        if self._file is None:
+            return
+
+        for idxBucket in range(self._numColors):
+            self._flushBucket(idxBucket)
+        self._file.write('</g>\n</svg>\n')
+        if self._ownsFile:
+            self._file.close()
+        self._file = None
+
+    def _flushBucket(self, idxBucket: int):
+        """
+        private helper, writes the collected subpaths of a color bucket as one <path>
+        """
+        if not self._buckets[idxBucket]:
+            return
+
+        self._file.write(f'<path stroke="{self._bucketColors[idxBucket]}" d="{"".join(self._buckets[idxBucket])}"/>\n')
+        self._buckets[idxBucket] = []
+        self._bucketSizes[idxBucket] = 0
+
+    def _formatPoints(self, coords: np.ndarray, separator: str) -> List[str]:
+        """
+        private helper, the points as "x<separator>y" strings with fixed precision
+        """
+        pointFormat = f'%.{self._precision}f{separator}%.{self._precision}f'
+        return ((pointFormat + '\n') * len(coords) % tuple(coords.ravel().tolist())).splitlines()
+
+
+def _asCoords(streamline: Union[np.ndarray, List[Vector]]) -> np.ndarray:
+    """
+    internal helper, a streamline as array of shape (N, 2)
+    """
+    if isinstance(streamline, np.ndarray):
+        return streamline.reshape(-1, 2)
+
+    return np.array([pt.asTuple() for pt in streamline], dtype=np.float64).reshape(-1, 2)
@@ -0,0 +1,375 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from LookupGrid import LookupGrid
+from StreamlineCollection import StreamlineCollection
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+logger = logging.getLogger(__name__)
+
+
+class TiledStreamlineGenerator:
+    """
+    parallel version of StreamlineGenerator for large canvases (domain decomposition)
+
+    1. the bbox is split into numTilesX * numTilesY tiles. Each tile is filled by a StreamlineGenerator in a process
+       pool, on the area of the tile plus a halo (haloFactor * dSep) on each side, so the streamlines run over the
+       borders of the tile.
+    2. merge: a streamline which runs over a tile border is joined with the streamline of the neighbour tile which
+       continues it (the parts in the overlap of the two domains are blended), the other streamlines are clipped to
+       their tile. Then the streamlines are added to one grid in a fixed order (by tile, row by row), points which are
+       too near (dTest) to the streamlines before are dropped, the streamlines are split there.
+    3. stitch: the gaps along the tile borders are filled by a (sequential) StreamlineGenerator, which starts with the
+       merged streamlines and only searches seed points next to the streamlines near a tile border
+       (see StreamlineGenerator.iterStreamlinesFromStreamlines()).
+
+    The result does not depend on the number of processes. It is not the result of StreamlineGenerator: a streamline is
+    split where the continuation in the neighbour tile is too near to a streamline of an earlier tile, and a few more
+    streamlines start near the tile borders. The flowFieldFunction must be picklable (a module level function or a field
+    object like RasterFlowField), it is passed to the worker processes.
+    """
+
+    DEFAULT_HALO_FACTOR = 2.0 # halo = DEFAULT_HALO_FACTOR * dSep
+    JOIN_DISTANCE_FACTOR = 0.5 # a streamline which runs over a tile border is continued by a streamline of the neighbour
+                               # tile at most JOIN_DISTANCE_FACTOR * dSep away from its end (or its start from it)
+    JOIN_MIN_COS = 0.9 # .. with (nearly) the same direction there: the cosine of the angle is at least this
+    SEED_LATTICE_SIZE = 4 # a tile starts at its center, or if the field has no direction there (a singularity), at the
+                          # first point of a SEED_LATTICE_SIZE x SEED_LATTICE_SIZE lattice (nearest to the center first) with one
+
+    def __init__(self, flowFieldFunction: Callable, dSep: float = None, dTest: float = None, stepSize: float = StreamlineGenerator.DEFAULT_TIME_STEP,
+                 numTilesX: int = 4, numTilesY: int = 4, maxWorkers: int = None, haloFactor: float = DEFAULT_HALO_FACTOR,
+                 lookupGridClass: Callable = LookupGrid):
+        """
+        maxWorkers: number of processes, default: number of cpus
+        lookupGridClass: the grid backend of the tiles and of the stitch pass
+        """
+        self._flowFieldFunction: Callable = flowFieldFunction
+        self.d_sep = StreamlineGenerator.DEFAULT_D_SEP if dSep is None else dSep
+        self.d_test = dTest if dTest is not None else self.d_sep * StreamlineGenerator.DEFAULT_D_TEST_FACTOR
+        self._stepSize: float = stepSize
+        self.numTilesX: int = numTilesX
+        self.numTilesY: int = numTilesY
+        self.maxWorkers: int = maxWorkers
+        self.haloFactor: float = haloFactor
+        self._lookupGridClass: Callable = lookupGridClass
+
+    def buildStreamlines(self, bbox: BoundingBox, initialStreamline: Vector = None, compact: bool = False) -> Union[List[List[Vector]], StreamlineCollection]:
+        """
+        the main function
+        initialStreamline: the seed point of the tile which contains it, the other tiles start at their centers
+                           (default: all tiles start at their centers), see SEED_LATTICE_SIZE
+        """
+        tiles = self._tiles(bbox)
+        jobs = []
+        for tile in tiles:
+            domain = self._withHalo(tile, bbox)
+            seedCandidates = self._seedCandidates(tile)
+            if initialStreamline is not None and _contains(tile, initialStreamline):
+                seedCandidates.insert(0, initialStreamline)
+            jobs.append((self._flowFieldFunction, self.d_sep, self.d_test, self._stepSize, self._lookupGridClass, domain, seedCandidates))
+
+        # ---- 1. fill the tiles in parallel
+        with ProcessPoolExecutor(max_workers=self.maxWorkers) as executor:
+            tileStreamlines = list(executor.map(_buildTile, jobs))
+
+        # ---- 2. merge
+        merged, searchIndexes = self._merge(bbox, tiles, tileStreamlines)
+        logger.info("%d streamlines merged from %d tiles, %d near the tile borders", len(merged), len(tiles), len(searchIndexes))
+
+        # ---- 3. stitch
+        generator = StreamlineGenerator(self._flowFieldFunction, self.d_sep, self.d_test, self._stepSize, self._lookupGridClass)
+        return generator.buildStreamlinesFromStreamlines(bbox, merged, searchIndexes, compact)
+
+    def _tiles(self, bbox: BoundingBox) -> List[BoundingBox]:
+        """
+        private helper, the tiles row by row
+        """
+        tileWidth = bbox.width / self.numTilesX
+        tileHeight = bbox.height / self.numTilesY
+
+        return [BoundingBox(bbox.topLeft.x + col * tileWidth, bbox.topLeft.y + row * tileHeight, tileWidth, tileHeight)
+                for row in range(self.numTilesY) for col in range(self.numTilesX)]
+
+    def _seedCandidates(self, tile: BoundingBox) -> List[Vector]:
+        """
+        private helper, the seed point candidates of a tile, see seedCandidates()
+        """
+        return seedCandidates(tile, self.SEED_LATTICE_SIZE)
+
+    def _withHalo(self, tile: BoundingBox, bbox: BoundingBox) -> BoundingBox:
+        """
+        private helper, the tile plus the halo, within the bbox
+        """
+        halo = self.haloFactor * self.d_sep
+        x0 = max(bbox.topLeft.x, tile.topLeft.x - halo)
+        y0 = max(bbox.topLeft.y, tile.topLeft.y - halo)
+        x1 = min(bbox.topLeft.x + bbox.width, tile.topLeft.x + tile.width + halo)
+        y1 = min(bbox.topLeft.y + bbox.height, tile.topLeft.y + tile.height + halo)
+
+        return BoundingBox(x0, y0, x1 - x0, y1 - y0)
+
+    def _merge(self, bbox: BoundingBox, tiles: List[BoundingBox], tileStreamlines: List[StreamlineCollection]) -> Tuple[StreamlineCollection, List[int]]:
+        """
+        private helper
+        1. the streamlines which run over a tile border are joined with their continuation in the neighbour tile
+           (see _join())
+        2. the joined streamlines are added to one grid in order (by their first tile), points which are too near (dTest)
+           to the streamlines before are dropped, the streamlines are split there
+        returns the merged streamlines and the indexes of those near a tile border (to be searched for seed points)
+        """
+        domains = [self._withHalo(tile, bbox) for tile in tiles]
+        pieces = [] # (coords, directions, speeds, idxTile) of all streamlines of all tiles
+        for idxTile, streamlines in enumerate(tileStreamlines):
+            for idxStreamline in range(len(streamlines)):
+                pieces.append((streamlines[idxStreamline], streamlines.directions(idxStreamline), streamlines.speeds(idxStreamline), idxTile))
+
+        grid = ArrayLookupGrid(bbox, self.d_sep)
+        merged = StreamlineCollection()
+        for coords, directions, speeds in self._join(tiles, domains, pieces):
+            idxPoint = 0
+            while idxPoint < len(coords):
+                # ---- the next run of points which are not too near, the points after it are checked against it too
+                runs = _runs(grid.arePointsValid(coords[idxPoint:], self.d_test))
+                if not runs:
+                    break
+                runStart, runEnd = (idxPoint + idx for idx in runs[0])
+                if runEnd - runStart >= 2: # a single point is no streamline
+                    merged.append(coords[runStart:runEnd], directions[runStart:runEnd], speeds[runStart:runEnd])
+                    grid.addPoints(coords[runStart:runEnd])
+                idxPoint = runEnd
+
+        # ---- the seed point candidates of points farther away from the tile borders were rejected by the tile already
+        borderDistance = (self.haloFactor + 2) * self.d_sep
+        searchIndexes = [idx for idx in range(len(merged)) if self._nearTileBorder(bbox, merged[idx], borderDistance)]
+
+        return merged, searchIndexes
+
+    def _join(self, tiles: List[BoundingBox], domains: List[BoundingBox], pieces: List[tuple]) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        private helper, joins the streamlines of the tiles which continue each other across a tile border, and clips the
+        others to their tile.
+        Where a streamline runs over a tile border, the streamline of the neighbour tile next to it is its continuation:
+        - it ends in the halo, and a streamline of the neighbour tile passes near its end, or
+        - a streamline of the neighbour tile starts in the halo of that tile, near it
+        near: at most JOIN_DISTANCE_FACTOR * dSep away, in the same direction. The parts of the two streamlines which run
+        next to each other (in the overlap of the two domains) are blended, from the first into the second one.
+        The nearest pairs are joined first, each streamline continues at most one and is continued by at most one.
+        The parts in the halo which are not joined are dropped, as the streamlines which are not joined and have most of
+        their points in the halo (the neighbour tile has its own streamlines there).
+        returns the joined streamlines (coords, directions, speeds), in the order of their first pieces
+        """
+        joinDistance = self.JOIN_DISTANCE_FACTOR * self.d_sep
+
+        # ---- the range of each streamline within its tile (without the leading and trailing points in the halo)
+        ranges = []
+        for coords, _, _, idxTile in pieces:
+            inside = _insideMask(tiles[idxTile], coords)
+            ranges.append((int(np.argmax(inside)), len(inside) - int(np.argmax(inside[::-1]))) if inside.any() else None)
+
+        tileCoords = {} # idxTile -> the points of the streamlines of the tile and the index of their streamline
+        for idxTile in range(len(tiles)):
+            idxPieces = [idx for idx, piece in enumerate(pieces) if piece[3] == idxTile and ranges[idx] is not None]
+            if idxPieces:
+                tileCoords[idxTile] = (np.concatenate([pieces[idx][0] for idx in idxPieces]),
+                                       np.repeat(idxPieces, [len(pieces[idx][0]) for idx in idxPieces]))
+
+        def nearStreamlines(pt: np.ndarray) -> Iterator[Tuple[float, int, int]]:
+            """
+            the streamlines of the tile which contains pt and pass near it: (distance, index, index of the nearest point)
+            """
+            idxTile = next((idx for idx, tile in enumerate(tiles) if _contains(tile, Vector(*pt.tolist()))), None)
+            if idxTile not in tileCoords:
+                return
+            candidates, owners = tileCoords[idxTile]
+            distances = np.hypot(candidates[:, 0] - pt[0], candidates[:, 1] - pt[1])
+            for idx in np.unique(owners[distances <= joinDistance]).tolist():
+                idxPoint = int(np.argmin(np.where(owners == idx, distances, np.inf)))
+                yield float(distances[idxPoint]), idx, idxPoint - int(np.searchsorted(owners, idx))
+
+        # ---- the candidate pairs: (distance, idxFrom, idxTo, idxFromNearest, idxToNearest, True if found at the end of
+        #      idxFrom / False if at the start of idxTo), the points where they meet
+        pairs = []
+        for idx, (coords, directions, _, idxTile) in enumerate(pieces):
+            if ranges[idx] is None:
+                continue
+            if not _contains(tiles[idxTile], Vector(*coords[-1].tolist())): # idx ends in the halo
+                for distance, idxTo, idxNearest in nearStreamlines(coords[-1]):
+                    coordsTo, directionsTo, _, idxTileTo = pieces[idxTo]
+                    prefix = coordsTo[:idxNearest + 1]
+                    if idxNearest < ranges[idxTo][1] and float(np.dot(directions[-1], directionsTo[idxNearest])) >= self.JOIN_MIN_COS and \
+                            _insideMask(domains[idxTile], prefix[_insideMask(tiles[idxTileTo], prefix)]).all():
+                        pairs.append((distance, idx, idxTo, len(coords) - 1, idxNearest, True))
+            if not _contains(tiles[idxTile], Vector(*coords[0].tolist())): # idx starts in the halo
+                for distance, idxFrom, idxNearest in nearStreamlines(coords[0]):
+                    coordsFrom, directionsFrom, _, idxTileFrom = pieces[idxFrom]
+                    suffix = coordsFrom[idxNearest:]
+                    if idxNearest >= ranges[idxFrom][0] and float(np.dot(directionsFrom[idxNearest], directions[0])) >= self.JOIN_MIN_COS and \
+                            _insideMask(domains[idxTile], suffix[_insideMask(tiles[idxTileFrom], suffix)]).all():
+                        pairs.append((distance, idxFrom, idx, idxNearest, 0, False))
+
+        # ---- join the nearest first, no cycles
+        successors = {} # idxFrom -> (idxTo, idxFromNearest, idxToNearest, atEnd)
+        predecessors = set()
+        chainHeads = list(range(len(pieces))) # union-find: the chain of each streamline
+        def findHead(idx: int) -> int:
+            while chainHeads[idx] != idx:
+                chainHeads[idx] = chainHeads[chainHeads[idx]]
+                idx = chainHeads[idx]
+            return idx
+        for _, idxFrom, idxTo, idxFromNearest, idxToNearest, atEnd in sorted(pairs):
+            if idxFrom in successors or idxTo in predecessors or findHead(idxFrom) == findHead(idxTo):
+                continue
+            successors[idxFrom] = (idxTo, idxFromNearest, idxToNearest, atEnd)
+            predecessors.add(idxTo)
+            chainHeads[findHead(idxTo)] = findHead(idxFrom)
+
+        joined = []
+        for idx in range(len(pieces)):
+            if idx in predecessors or ranges[idx] is None:
+                continue
+            start, end = ranges[idx]
+            if idx not in successors and 2 * (end - start) < len(pieces[idx][0]):
+                continue
+            end = len(pieces[idx][0]) if idx in successors else end
+            streamline = tuple(column[start:end] for column in pieces[idx][:3])
+            while idx in successors:
+                idxTo, idxFromNearest, idxToNearest, atEnd = successors[idx]
+                idxFromNearest = max(idxFromNearest - (end - len(streamline[0])), 0) # the index in the (joined) streamline, which ends with idx[:end]
+                domainFrom = domains[pieces[idx][3]]
+                idx = idxTo
+                end = len(pieces[idx][0]) if idx in successors else ranges[idx][1]
+                continuation = tuple(column[:end] for column in pieces[idx][:3])
+
+                # ---- the parts which run next to each other: from where the first streamline enters the domain of the
+                #      continuation to its end, or from where the continuation starts to where it leaves the first domain
+                if atEnd:
+                    inside = _insideMask(domains[pieces[idx][3]], streamline[0])
+                    firstStart = len(inside) - int(np.argmin(inside[::-1])) if not inside.all() else 0
+                    firstEnd = len(inside)
+                    secondEnd = min(idxToNearest + 2, end)
+                else:
+                    inside = _insideMask(domainFrom, continuation[0])
+                    secondEnd = min((int(np.argmin(inside)) if not inside.all() else len(inside)) + 1, end)
+                    firstStart = idxFromNearest
+                    firstEnd = firstStart + 1 + int(np.argmin(np.hypot(*(streamline[0][firstStart:] - continuation[0][secondEnd - 1]).T)))
+                streamline = _blend(streamline, continuation, firstStart, firstEnd, secondEnd)
+            joined.append(streamline)
+
+        return joined
+
+    def _nearTileBorder(self, bbox: BoundingBox, coords: np.ndarray, distance: float) -> bool:
+        """
+        private helper, True if one of the points is near a border between two tiles
+        """
+        tileWidth = bbox.width / self.numTilesX
+        tileHeight = bbox.height / self.numTilesY
+        u = (coords[:, 0] - bbox.topLeft.x) / tileWidth
+        v = (coords[:, 1] - bbox.topLeft.y) / tileHeight
+        nearX = (np.abs(u - np.clip(np.round(u), 1, self.numTilesX - 1)) * tileWidth <= distance) if self.numTilesX > 1 else False
+        nearY = (np.abs(v - np.clip(np.round(v), 1, self.numTilesY - 1)) * tileHeight <= distance) if self.numTilesY > 1 else False
+
+        return bool(np.any(nearX | nearY))
+
+
+def seedCandidates(bbox: BoundingBox, latticeSize: int = TiledStreamlineGenerator.SEED_LATTICE_SIZE) -> List[Vector]:
+    """
+    the seed point candidates of a bbox where no seed point is given (a tile, a BatchJob without seed): its center, then
+    the points of a latticeSize x latticeSize lattice by distance to the center (row by row for equal distances).
+    The first one where the field has a direction is used (the center may be a singularity).
+    """
+    center = _center(bbox)
+    lattice = [Vector(bbox.topLeft.x + (col + 0.5) * bbox.width / latticeSize, bbox.topLeft.y + (row + 0.5) * bbox.height / latticeSize)
+               for row in range(latticeSize) for col in range(latticeSize)]
+
+    return [center] + sorted(lattice, key=lambda pt: pt.distanceTo(center))
+
+
+def _buildTile(job: tuple) -> StreamlineCollection:
+    """
+    internal helper, runs in a worker process: fills the domain of a tile, from the first seed point candidate where
+    the field has a direction
+    """
+    flowFieldFunction, dSep, dTest, stepSize, lookupGridClass, domain, seedCandidates = job
+    generator = StreamlineGenerator(flowFieldFunction, dSep, dTest, stepSize, lookupGridClass)
+    seedPoint = next((pt for pt in seedCandidates if generator.vectorFieldNormalized(pt) is not None), None)
+    if seedPoint is None:
+        logger.warning("no seed point with a defined direction in the tile at %s", domain.topLeft)
+        return StreamlineCollection()
+
+    return generator.buildStreamlines(domain, seedPoint, compact=True)
+
+
+def _blend(first: tuple, second: tuple, firstStart: int, firstEnd: int, secondEnd: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    internal helper, joins two streamlines (coords, directions, speeds) where first[firstStart:firstEnd] runs next to
+    second[:secondEnd]: these points of the first streamline move over to the second one step by step (to the nearest
+    points of the second one), then the second streamline continues
+    """
+    points = first[0][firstStart:firstEnd]
+    segmentStarts = second[0][:max(secondEnd - 1, 1)]
+    segments = second[0][1:max(secondEnd, 2)] - segmentStarts
+    if len(segments) == 0: # a single point
+        segmentStarts = second[0][:1]
+        segments = np.zeros((1, 2))
+
+    # ---- the nearest points on the polyline second[:secondEnd], as position (index of the segment + fraction), which
+    #      only moves forward
+    lengthsSquared = np.maximum((segments * segments).sum(axis=1), 1e-300)
+    relative = points[:, np.newaxis, :] - segmentStarts[np.newaxis, :, :]
+    fractions = np.clip((relative * segments[np.newaxis, :, :]).sum(axis=2) / lengthsSquared, 0, 1)
+    distances = np.hypot(*(relative - fractions[:, :, np.newaxis] * segments[np.newaxis, :, :]).transpose(2, 0, 1))
+    idxSegments = np.argmin(distances, axis=1)
+    positions = np.maximum.accumulate(idxSegments + fractions[np.arange(len(points)), idxSegments])
+    atEnd = positions >= len(segments) # the points after the first one beyond the end of second[:secondEnd] are dropped
+    if atEnd.any():
+        firstEnd = firstStart + int(np.argmax(atEnd)) + 1
+        points = points[:firstEnd - firstStart]
+        positions = positions[:firstEnd - firstStart]
+    idxLower = np.minimum(np.floor(positions).astype(np.int64), len(second[0]) - 1)
+    idxUpper = np.minimum(idxLower + 1, len(second[0]) - 1)
+    fractions = positions - idxLower
+
+    t = np.arange(1, len(points) + 1) / len(points)
+    weights = t * t * (3 - 2 * t) # smooth, the last point is on the second streamline
+
+    blended = []
+    for first_, second_ in zip(first, second):
+        w, f = (weights, fractions) if first_.ndim == 1 else (weights[:, np.newaxis], fractions[:, np.newaxis])
+        nearest = (1 - f) * second_[idxLower] + f * second_[idxUpper]
+        blended.append(np.concatenate([first_[:firstStart], (1 - w) * first_[firstStart:firstEnd] + w * nearest, second_[int(idxLower[-1]) + 1:]]))
+    coords, directions, speeds = blended
+
+    return coords, directions / np.hypot(directions[:, 0], directions[:, 1])[:, np.newaxis], speeds
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    internal helper, the [start, end) ranges of the consecutive True values
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8)))
+
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def _insideMask(tile: BoundingBox, coords: np.ndarray) -> np.ndarray:
+    """
+    internal helper, the points in the tile (left / top border inclusive)
+    """
+    x = coords[:, 0]
+    y = coords[:, 1]
+    return (x >= tile.topLeft.x) & (x < tile.topLeft.x + tile.width) & (y >= tile.topLeft.y) & (y < tile.topLeft.y + tile.height)
+
+
+def _contains(tile: BoundingBox, pt: Vector) -> bool:
+    return tile.topLeft.x <= pt.x < tile.topLeft.x + tile.width and tile.topLeft.y <= pt.y < tile.topLeft.y + tile.height
+
+
+def _center(tile: BoundingBox) -> Vector:
+    return Vector(tile.topLeft.x + tile.width / 2, tile.topLeft.y + tile.height / 2)
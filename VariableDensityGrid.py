@@ -0,0 +1,35 @@
+import math
+
+from BoundingBox import BoundingBox
+from SparseLookupGrid import SparseLookupGrid
+from Vector import Vector
+
+
+class VariableDensityGrid(SparseLookupGrid):
+    """
+    lookup grid for a spatially varying dSep (see StreamlineGenerator with a dSep function): the query distance may be
+    different for every query, and greater than the cell size.
+
+    The cells are sparse (see SparseLookupGrid), so the memory depends on the area covered by streamlines, not on
+    bbox area / cellSize ** 2.
+    The cell size should be the smallest dSep (StreamlineGenerator uses the smallest dSep sampled over the bbox), a query
+    for minDistance visits the cells within ceil(minDistance / cellSize) rings around the cell of the point: in dense
+    regions (small dSep) few cells with few points, in sparse regions more, but mostly empty cells.
+    The cell size only changes the speed, not the results.
+    """
+
+    def __init__(self, bbox: BoundingBox, cellSize: float):
+        super().__init__(bbox, cellSize)
+        self.cellSize: float = cellSize
+
+    def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+        """
+        1st) checks if pt is inside ouf bounds of the grid
+        2nd) returns True if all points inside this grid have distance to passed pt >= minDistance, False otherwise
+        """
+        if self.stats is not None:
+            self.stats.numGridQueries += 1
+        if self._isOutside(pt):
+            return False
+
+        return not self._hasPointWithin(pt, minDistance, max(1, math.ceil(minDistance / self.cellSize)))
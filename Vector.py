@@ -2,6 +2,8 @@ import math
 
 
 class Vector:
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: float, y: float):
         self.x: float = x
         self.y: float = y
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+benchmark of the fixed step (Rk4Integrator) vs the adaptive (DormandPrinceIntegrator) integrator
+
+a single streamline of a vortex field (circles around the origin) is built, one turn of the passed radius: the smaller
+the radius, the curlier the flow. The exact path is known, so the geometric error is the max. deviation of the points
+from the circle. Reported are the field evaluations per unit of arc length, including the evaluation at each point of
+the streamline (its direction).
+
+The adaptive integrator resamples its output to the spacing D_TEST, the fixed step integrator needs smaller steps
+for the same error in curly flow.
+
+usage: python3 benchmarks/adaptiveIntegrator.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from DormandPrinceIntegrator import DormandPrinceIntegrator
+from LookupGrid import LookupGrid
+from Rk4Integrator import Rk4Integrator
+from StreamlineGenerator import StreamlineGenerator
+from StreamlineIntegrator import StreamlineIntegrator
+from Vector import Vector
+
+
+D_TEST = 2.0
+
+
+def vortexFlowFieldFunction(coords: Vector) -> Vector:
+    return Vector(-coords.y, coords.x)
+
+
+def benchIntegrator(name: str, integrator, stepSize: float, radius: float):
+    """
+    prints the field evaluations per unit of arc length and the max. distance of the points to the exact circle
+    """
+    numEvaluations = 0
+
+    def countingField(coords: Vector) -> Vector:
+        nonlocal numEvaluations
+        numEvaluations += 1
+        return vortexFlowFieldFunction(coords)
+
+    bbox = BoundingBox(-2 * radius, -2 * radius, 4 * radius, 4 * radius)
+    generator = StreamlineGenerator(countingField, 20, D_TEST, stepSize)
+    grid = LookupGrid(bbox, generator.d_sep)
+    streamlineIntegrator = StreamlineIntegrator(generator.vectorFieldNormalized, grid, stepSize, generator.d_test,
+                                                generator.sampleVectorField, integrator)
+    streamline = streamlineIntegrator.buildStreamline(Vector(radius, 0))
+
+    arcLength = sum(streamline[idx - 1].distanceTo(streamline[idx]) for idx in range(1, len(streamline)))
+    maxError = max(abs(pt.length() - radius) for pt in streamline)
+    maxSpacing = max(streamline[idx - 1].distanceTo(streamline[idx]) for idx in range(1, len(streamline)))
+    print(f"{name:<32} stepSize {stepSize:5.3f}: {len(streamline):>5} points, max spacing {maxSpacing:5.3f}, "
+          f"{numEvaluations / arcLength:6.2f} evaluations / unit of arc length, max error {maxError:.2e}")
+
+
+if __name__ == '__main__':
+    for radius in [5.0, 50.0]:
+        print(f"---- vortex, radius {radius}")
+        for stepSize in [2.0, 1.0, 0.5, 0.25]:
+            benchIntegrator('Rk4Integrator', Rk4Integrator(), stepSize, radius)
+        for tolerance in [1e-4, 1e-6, 1e-8]:
+            benchIntegrator(f'DormandPrinceIntegrator tol={tolerance:.0e}', DormandPrinceIntegrator(tolerance), D_TEST, radius)
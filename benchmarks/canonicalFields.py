@@ -0,0 +1,58 @@
+"""
+the canonical flow fields of the benchmark suite (see suite.py), all centered at (0, 0)
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from RasterFlowField import RasterFlowField
+from Vector import Vector
+
+
+def uniformField(coords: Vector) -> Vector:
+    return Vector(1.0, 0.3)
+
+
+def vortexField(coords: Vector) -> Vector:
+    return Vector(-coords.y, coords.x)
+
+
+def saddleField(coords: Vector) -> Vector:
+    return Vector(coords.x, -coords.y)
+
+
+def demoField(coords: Vector) -> Vector:
+    """
+    the field of demo.py
+    """
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+def rasterField(bbox: BoundingBox, samplesPerUnit: float = 0.25) -> RasterFlowField:
+    """
+    a RasterFlowField covering the bbox: a sampled mix of a vortex and waves (deterministic)
+    """
+    numCols = max(2, int(bbox.width * samplesPerUnit) + 1)
+    numRows = max(2, int(bbox.height * samplesPerUnit) + 1)
+    x, y = np.meshgrid(np.linspace(bbox.topLeft.x, bbox.topLeft.x + bbox.width, numCols),
+                       np.linspace(bbox.topLeft.y, bbox.topLeft.y + bbox.height, numRows))
+    u = -y * 0.01 + np.sin(x * 0.03) * 0.5
+    v = x * 0.01 + np.cos(y * 0.02) * 0.5
+
+    return RasterFlowField(u, v, bbox)
+
+
+# name -> (field or field factory of a bbox, True if it is a factory)
+CANONICAL_FIELDS = {
+    'uniform': (uniformField, False),
+    'vortex': (vortexField, False),
+    'saddle': (saddleField, False),
+    'demo': (demoField, False),
+    'raster': (rasterField, True),
+}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+benchmark of the grid backends: the exact LookupGrid / ArrayLookupGrid vs the approximate DistanceFieldGrid at
+several resolutions. Builds the streamlines of the demo field and reports wall time, number of streamlines and the
+points which are nearer than dTest to an earlier streamline (0 for the exact grids). Then times single queries
+(isPointValid) on the filled grid.
+
+usage: python3 benchmarks/distanceFieldGrid.py [width height dSep dTest]
+"""
+import functools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from DistanceFieldGrid import DistanceFieldGrid
+from LookupGrid import LookupGrid
+from StreamlineCollection import StreamlineCollection
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+from canonicalFields import demoField
+
+
+NUM_QUERIES = 20000
+
+
+def countViolations(bbox: BoundingBox, streamlines: StreamlineCollection, dSep: float, dTest: float) -> int:
+    """
+    number of points nearer than dTest to an earlier streamline (checked with the exact grid)
+    """
+    grid = ArrayLookupGrid(bbox, dSep)
+    numViolations = 0
+    for streamline in streamlines:
+        numViolations += int((~grid.arePointsValid(streamline, dTest)).sum())
+        grid.addPoints(streamline)
+
+    return numViolations
+
+
+def benchQueries(grid, bbox: BoundingBox, minDistance: float) -> float:
+    """
+    microseconds per isPointValid() call, at random points
+    """
+    rnd = random.Random(42)
+    points = [Vector(bbox.topLeft.x + rnd.random() * (bbox.width - 1), bbox.topLeft.y + rnd.random() * (bbox.height - 1))
+              for _ in range(NUM_QUERIES)]
+    t0 = time.perf_counter()
+    for pt in points:
+        grid.isPointValid(pt, minDistance)
+
+    return (time.perf_counter() - t0) / NUM_QUERIES * 1e6
+
+
+def bench(name: str, gridClass, bbox: BoundingBox, dSep: float, dTest: float):
+    generator = StreamlineGenerator(demoField, dSep, dTest, lookupGridClass=gridClass)
+    t0 = time.perf_counter()
+    streamlines = generator.buildStreamlines(bbox, Vector(10, 10), compact=True)
+    elapsed = time.perf_counter() - t0
+    grid = generator._lookupGrid
+    print(f"{name:<32} {elapsed:7.2f} s, {len(streamlines):>5} streamlines, {streamlines.numPoints():>7} points, "
+          f"{countViolations(bbox, streamlines, dSep, dTest):>5} dTest violations, "
+          f"query dTest {benchQueries(grid, bbox, dTest):5.2f} us, dSep {benchQueries(grid, bbox, dSep):5.2f} us")
+
+
+def main():
+    width, height, dSep, dTest = (float(arg) for arg in sys.argv[1:5]) if len(sys.argv) > 4 else (800, 600, 10, 2)
+    bbox = BoundingBox(-width / 2, -height / 2, width, height)
+    print(f"demo field {width:g}x{height:g}, dSep {dSep:g}, dTest {dTest:g}")
+    bench('LookupGrid', LookupGrid, bbox, dSep, dTest)
+    bench('ArrayLookupGrid', ArrayLookupGrid, bbox, dSep, dTest)
+    for factor in (0.25, 0.125, 0.0625):
+        resolution = dSep * factor
+        bench(f'DistanceFieldGrid {resolution:g}', functools.partial(DistanceFieldGrid, resolution=resolution), bbox, dSep, dTest)
+
+
+if __name__ == '__main__':
+    main()
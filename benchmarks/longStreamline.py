@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+benchmark for building single, very long streamlines (5k .. 20k points)
+
+the seed point is in the center of the bounding box, so half of the points are grown FORWARD and half BACKWARD.
+
+usage: python3 benchmarks/longStreamline.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from LookupGrid import LookupGrid
+from StreamlineGenerator import StreamlineGenerator
+from StreamlineIntegrator import StreamlineIntegrator
+from Vector import Vector
+
+
+def uniformFlowFieldFunction(coords: Vector) -> Vector:
+    return Vector(1.0, 0.1)
+
+
+def benchLongStreamline(numPoints: int, stepSize: float = 1.0, repeat: int = 3) -> float:
+    """
+    returns the best wall time (in seconds) of building a single streamline with approx numPoints points
+    """
+    width = numPoints * stepSize
+    bbox = BoundingBox(-width / 2, -width / 2, width, width)
+    generator = StreamlineGenerator(uniformFlowFieldFunction, 20, 2, stepSize)
+
+    best = None
+    for _ in range(repeat):
+        grid = LookupGrid(bbox, generator.d_sep)
+        integrator = StreamlineIntegrator(generator.vectorFieldNormalized, grid, stepSize, generator.d_test)
+        t0 = time.perf_counter()
+        streamline = integrator.buildStreamline(Vector(0, 0))
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{len(streamline):>6} points: {best * 1000:8.1f} ms ({best / len(streamline) * 1e6:.2f} us/point)")
+    return best
+
+
+if __name__ == '__main__':
+    for n in [5000, 10000, 20000]:
+        benchLongStreamline(n)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+benchmark of the grid backends for a huge, mostly empty bounding box: the demo field is only defined (non-zero) in a
+small region of the bbox, so the streamlines cover only this region. Reports per backend the time and the peak memory
+(tracemalloc) of creating the grid and of the whole build, and the number of streamlines (equal for all backends).
+
+usage: python3 benchmarks/sparseLookupGrid.py [width height dSep]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from LookupGrid import LookupGrid
+from SparseLookupGrid import SparseLookupGrid
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+from canonicalFields import demoField
+
+
+REGION = BoundingBox(-200, -150, 400, 300) # where the field is defined
+D_TEST_FACTOR = 0.2
+
+
+def regionField(coords: Vector) -> Vector:
+    """
+    the demo field inside REGION, zero (a singularity, the streamlines end there) outside
+    """
+    if REGION.topLeft.x <= coords.x <= REGION.topLeft.x + REGION.width and REGION.topLeft.y <= coords.y <= REGION.topLeft.y + REGION.height:
+        return demoField(coords)
+
+    return Vector(0, 0)
+
+
+def measure(function):
+    """
+    (result, seconds, peak memory in bytes) of a call
+    """
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - t0
+    peakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, elapsed, peakMemory
+
+
+def bench(name: str, gridClass, bbox: BoundingBox, dSep: float):
+    grid, initTime, initMemory = measure(lambda: gridClass(bbox, dSep))
+    del grid
+    generator = StreamlineGenerator(regionField, dSep, dSep * D_TEST_FACTOR, lookupGridClass=gridClass)
+    streamlines, buildTime, buildMemory = measure(lambda: generator.buildStreamlines(bbox, Vector(10, 10), compact=True))
+    print(f"{name:<20} grid init {initTime:7.3f} s, {initMemory / 2**20:8.1f} MB | build {buildTime:7.2f} s, "
+          f"{buildMemory / 2**20:8.1f} MB, {len(streamlines):>5} streamlines, {streamlines.numPoints():>7} points")
+
+
+def main():
+    width, height, dSep = (float(arg) for arg in sys.argv[1:4]) if len(sys.argv) > 3 else (10000, 10000, 10)
+    bbox = BoundingBox(-width / 2, -height / 2, width, height)
+    print(f"demo field in {REGION.width:g}x{REGION.height:g} of a {width:g}x{height:g} bbox, dSep {dSep:g} "
+          f"({int(width / dSep) * int(height / dSep)} cells)")
+    bench('SparseLookupGrid', SparseLookupGrid, bbox, dSep)
+    bench('ArrayLookupGrid', ArrayLookupGrid, bbox, dSep)
+    bench('LookupGrid', LookupGrid, bbox, dSep)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+benchmark suite: the canonical fields (canonicalFields.py) at several canvas sizes and dSep / dTest / stepSize
+combinations. Reports per run as json: wall time, field evaluations, isPointValid calls (points checked), sample
+points and streamlines produced, and peak memory (tracemalloc, measured in a second run, as it slows down python).
+
+usage: python3 benchmarks/suite.py [--output report.json] [--baseline baseline.json] [--quick] [--filter demo] [--grid ArrayLookupGrid]
+
+with --baseline the results are compared to a previous report (matched by name): time and evaluation ratios, and a
+warning if a run produced different streamlines.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+from canonicalFields import CANONICAL_FIELDS
+
+
+CANVAS_SIZES = [(200, 150), (400, 300), (800, 600)]
+PARAMETERS = [ # (dSep, dTest, stepSize)
+    (10, 2, 1.0),
+    (20, 6, 1.0),
+    (10, 5, 0.5),
+]
+SEED_POINT = Vector(10, 10)
+
+
+class _CountingField:
+    """
+    internal helper, counts the evaluations of a field (points, also on the batch path)
+    """
+
+    def __init__(self, field: Callable):
+        self.field: Callable = field
+        self.numEvaluations: int = 0
+        if hasattr(field, 'evaluateBatch'):
+            self.evaluateBatch = self._evaluateBatch # only if the field has a batch path
+
+    def __call__(self, coords: Vector):
+        self.numEvaluations += 1
+        return self.field(coords)
+
+    def _evaluateBatch(self, coords: np.ndarray) -> np.ndarray:
+        self.numEvaluations += len(coords)
+        return self.field.evaluateBatch(coords)
+
+
+def _countingGridClass(gridClass: Callable) -> Callable:
+    """
+    internal helper, a subclass of the grid class which counts the points checked by isPointValid() / arePointsValid()
+    """
+    class CountingGrid(gridClass):
+        numPointsChecked = 0
+
+        def isPointValid(self, pt: Vector, minDistance: float) -> bool:
+            CountingGrid.numPointsChecked += 1
+            return super().isPointValid(pt, minDistance)
+
+        def arePointsValid(self, points: np.ndarray, minDistance: float) -> np.ndarray:
+            numPointsChecked = CountingGrid.numPointsChecked # the base class may call isPointValid() per point
+            valid = super().arePointsValid(points, minDistance)
+            CountingGrid.numPointsChecked = numPointsChecked + len(points)
+            return valid
+
+    return CountingGrid
+
+
+def cases(quick: bool = False, nameFilter: str = None) -> List[dict]:
+    result = []
+    for fieldName in CANONICAL_FIELDS:
+        for width, height in CANVAS_SIZES[:1] if quick else CANVAS_SIZES:
+            for dSep, dTest, stepSize in PARAMETERS[:1] if quick else PARAMETERS:
+                name = f"{fieldName}-{width}x{height}-dSep{dSep}-dTest{dTest}-step{stepSize}"
+                if nameFilter is None or nameFilter in name:
+                    result.append({'name': name, 'field': fieldName, 'width': width, 'height': height,
+                                   'dSep': dSep, 'dTest': dTest, 'stepSize': stepSize})
+
+    return result
+
+
+def runCase(case: dict, gridClass: Callable, measureMemory: bool = True) -> dict:
+    bbox = BoundingBox(-case['width'] / 2, -case['height'] / 2, case['width'], case['height'])
+
+    def build():
+        field, isFactory = CANONICAL_FIELDS[case['field']]
+        countingField = _CountingField(field(bbox) if isFactory else field)
+        countingGridClass = _countingGridClass(gridClass)
+        generator = StreamlineGenerator(countingField, case['dSep'], case['dTest'], case['stepSize'], countingGridClass)
+        streamlines = generator.buildStreamlines(bbox, SEED_POINT, compact=True)
+        return streamlines, countingField.numEvaluations, countingGridClass.numPointsChecked
+
+    t0 = time.perf_counter()
+    streamlines, numEvaluations, numPointsChecked = build()
+    wallTime = time.perf_counter() - t0
+
+    peakMemory = None
+    if measureMemory:
+        tracemalloc.start()
+        build()
+        peakMemory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return dict(case, wallTime=wallTime, fieldEvaluations=numEvaluations, isPointValidCalls=numPointsChecked,
+                samplePoints=streamlines.numPoints(), streamlines=len(streamlines),
+                checksum=float(streamlines.coords.sum()), peakMemoryBytes=peakMemory)
+
+
+def compareToBaseline(results: List[dict], baseline: List[dict]):
+    """
+    prints the ratios to the baseline (< 1 is faster / fewer)
+    """
+    baselineByName = {result['name']: result for result in baseline}
+    print(f"\n{'name':<44} {'time':>7} {'evals':>7} {'checks':>7} {'memory':>7}")
+    for result in results:
+        base = baselineByName.get(result['name'])
+        if base is None:
+            print(f"{result['name']:<44} (not in the baseline)")
+            continue
+
+        ratios = [_ratio(result[key], base[key]) for key in ('wallTime', 'fieldEvaluations', 'isPointValidCalls', 'peakMemoryBytes')]
+        changed = '' if (result['samplePoints'], result['streamlines'], result['checksum']) == \
+                        (base['samplePoints'], base['streamlines'], base['checksum']) else '  DIFFERENT STREAMLINES'
+        print(f"{result['name']:<44} " + ' '.join(f"{ratio:>7}" for ratio in ratios) + changed)
+
+
+def _ratio(value, baseValue) -> str:
+    if value is None or not baseValue:
+        return '-'
+    return f"{value / baseValue:.2f}"
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='streamline benchmark suite')
+    parser.add_argument('--output', default=None, help='json file for the report (default: print only)')
+    parser.add_argument('--baseline', default=None, help='json report of a previous run to compare with')
+    parser.add_argument('--quick', action='store_true', help='only the smallest canvas and the first parameter combination')
+    parser.add_argument('--filter', default=None, help='only runs whose name contains this string')
+    parser.add_argument('--grid', default='LookupGrid', help='the grid backend (module and class name), default: LookupGrid')
+    parser.add_argument('--no-memory', action='store_true', help='do not measure the peak memory (saves the second run)')
+    args = parser.parse_args(argv)
+
+    gridClass = getattr(importlib.import_module(args.grid), args.grid)
+    results = []
+    for case in cases(args.quick, args.filter):
+        result = runCase(case, gridClass, not args.no_memory)
+        results.append(result)
+        memory = '' if result['peakMemoryBytes'] is None else f", {result['peakMemoryBytes'] / 2**20:.1f} MB"
+        print(f"{result['name']:<44} {result['wallTime']:7.2f} s, {result['fieldEvaluations']:>8} evals, "
+              f"{result['isPointValidCalls']:>8} checks, {result['samplePoints']:>7} points, {result['streamlines']:>5} streamlines{memory}")
+
+    report = {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+                 'grid': args.grid, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compareToBaseline(results, json.load(f)['results'])
+
+
+if __name__ == '__main__':
+    main()
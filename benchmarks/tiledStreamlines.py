@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+benchmark of TiledStreamlineGenerator: wall time with 1, 2, 4, .. worker processes vs the sequential StreamlineGenerator
+
+usage: python3 benchmarks/tiledStreamlines.py [width height numTiles]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from StreamlineGenerator import StreamlineGenerator
+from TiledStreamlineGenerator import TiledStreamlineGenerator
+from Vector import Vector
+
+
+D_SEP = 10
+D_TEST = 2
+
+
+def demoFlowFieldFunction(coords: Vector) -> Vector:
+    """
+    the field of demo.py (module level, so it can be passed to the worker processes)
+    """
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+def benchTiled(bbox: BoundingBox, numTiles: int, maxWorkers: int) -> float:
+    generator = TiledStreamlineGenerator(demoFlowFieldFunction, D_SEP, D_TEST, numTilesX=numTiles, numTilesY=numTiles, maxWorkers=maxWorkers)
+    t0 = time.perf_counter()
+    streamlines = generator.buildStreamlines(bbox, compact=True)
+    elapsed = time.perf_counter() - t0
+    print(f"{numTiles}x{numTiles} tiles, {maxWorkers:>2} workers: {elapsed:7.2f} s, {len(streamlines)} streamlines, {streamlines.numPoints()} points")
+    return elapsed
+
+
+if __name__ == '__main__':
+    width, height, numTiles = (int(arg) for arg in sys.argv[1:4]) if len(sys.argv) > 3 else (1600, 1200, 4)
+    bbox = BoundingBox(-width / 2, -height / 2, width, height)
+
+    t0 = time.perf_counter()
+    streamlines = StreamlineGenerator(demoFlowFieldFunction, D_SEP, D_TEST).buildStreamlines(bbox, Vector(10, 10), compact=True)
+    print(f"sequential:               {time.perf_counter() - t0:7.2f} s, {len(streamlines)} streamlines, {streamlines.numPoints()} points")
+
+    maxWorkers = 1
+    while maxWorkers <= os.cpu_count():
+        benchTiled(bbox, numTiles, maxWorkers)
+        maxWorkers *= 2
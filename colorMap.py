@@ -0,0 +1,27 @@
+import numpy as np
+
+
+# ---- the colors of the velocity gradient
+COLOR_SLOW = np.array([0, 70, 135], dtype=np.float64) # dark blue
+COLOR_MEDIUM = np.array([250, 253, 200], dtype=np.float64) # light yellow
+COLOR_FAST = np.array([166, 0, 33], dtype=np.float64) # dark red
+
+
+def velocityColors(values01: np.ndarray) -> np.ndarray:
+    """
+    LERP of 3 colors (dark blue .. light yellow .. dark red), vectorized
+    values01 is an array of shape (N,) with values in [0..1] (NaN is treated as 0), returns the RGB colors as array of
+    shape (N, 3) with values in [0..255]
+    """
+    l01 = np.nan_to_num(np.clip(np.asarray(values01, dtype=np.float64), 0.0, 1.0), nan=0.0)[:, np.newaxis]
+    lower = COLOR_MEDIUM * l01 * 2.0 + COLOR_SLOW * (0.5 - l01) * 2.0
+    upper = COLOR_FAST * (l01 - 0.5) * 2.0 + COLOR_MEDIUM * (1.0 - l01) * 2.0
+
+    return np.where(l01 <= 0.5, lower, upper)
+
+
+def normalizeSpeeds(speeds: np.ndarray, minSpeed: float, maxSpeed: float) -> np.ndarray:
+    """
+    maps speeds from [minSpeed..maxSpeed] to [0..1], NaN stays NaN
+    """
+    return (np.asarray(speeds, dtype=np.float64) - minSpeed) / (maxSpeed - minSpeed)
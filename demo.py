@@ -1,14 +1,14 @@
 #!/usr/bin/env python3.7
 import math
-from typing import List, Union, Callable
+from typing import List, Tuple, Union, Callable
 import numpy as np
 
-from pysvg.builders import ShapeBuilder
-from pysvg.builders import StyleBuilder
-from pysvg.structure import Svg
-
+from BatchFlowField import BatchFlowField, evaluateFieldBatch
 from BoundingBox import BoundingBox
+from RasterRenderer import RasterRenderer
 from StreamlineGenerator import StreamlineGenerator
+from SvgWriter import SvgWriter
+from colorMap import normalizeSpeeds
 from Vector import Vector
 
 
@@ -44,48 +44,41 @@ UNTIL bFinished == True
 def toSvgPolylines(bbox: BoundingBox, streamlines: List[List[Vector]], pathDestFile: str):
     """
     write monochrome streamlines to a svg file for visualization
-    pip3 install pysvg-py3
     """
-
-
-    # ---- build svg
-    mySVG = Svg(width=bbox.width, height=bbox.height, viewBox=f"{bbox.topLeft.x} {bbox.topLeft.y} {bbox.width} {bbox.height}")
-    shapeBuilder = ShapeBuilder()
-    styleBuilder = StyleBuilder()
-    styleBuilder.setStroke('blue')
-    styleBuilder.setFilling('none')
-    styleBuilder.setStrokeWidth('1px')
-    styleBuilder.setStrokeLineCap('round')
-
-    # background
-    mySVG.addElement(shapeBuilder.createRect(x=bbox.topLeft.x, y=bbox.topLeft.y, width="100%", height="100%", fill="white", stroke='none'))
-
-    # streamlines
-    for sl in streamlines:
-        polyline = shapeBuilder.createPolyline(shapeBuilder.convertTupleArrayToPoints([pt.asTuple() for pt in sl]))
-        polyline.set_style(styleBuilder.getStyle())
-        mySVG.addElement(polyline)
-
-    # save svg
     print(f"writing {pathDestFile} ...")
-    mySVG.save(pathDestFile)
+    with SvgWriter(pathDestFile, bbox, background='white') as writer:
+        for sl in streamlines:
+            writer.addPolyline(sl, stroke='blue')
 
 
-def toSvgWithVelocityColors(bbox: BoundingBox, streamlines: List[List[Vector]], field: Callable, pathDestFile: str):
+def toSvgWithVelocityColors(bbox: BoundingBox, streamlines: List[List[Vector]], field: Callable, pathDestFile: str, speeds: List[List[float]] = None,
+                            speedRange: Tuple[float, float] = None):
     """
     write streamlines to a svg file for visualization with colors encoded velocity
-    pip3 install pysvg-py3
     :param bbox:
     :param streamlines:
-    :param field: the original vector field (not the normalized)
+    :param field: the original vector field (not the normalized), evaluated in bulk if it has a batch path (BatchFlowField)
+    :param speeds: the vector lengths at the streamline points as recorded by the generator (StreamlineGenerator.getStreamlineSpeeds()),
+                   if passed, the field is not evaluated again
+    :param speedRange: (min, max) of the color map, default: of the lengths at the streamline points. Simplified
+                       streamlines drop points, pass the range of the full streamlines to keep the colors of the png
     :return:
     """
 
     # ---- get vector lengths (aka skalar velocity) over all streamline points
-    lengths = [[field(pt).length() for pt in sl] for sl in streamlines]
-    flattened = [val for sublist in lengths for val in sublist]
-    minL = min(flattened)
-    maxL = max(flattened)
+    if speeds is not None:
+        lengths = speeds
+    else:
+        lengths = []
+        for sl in streamlines:
+            velocities = evaluateFieldBatch(field, np.array([pt.asTuple() for pt in sl], dtype=np.float64).reshape(-1, 2))
+            lengths.append(np.sqrt(velocities[:, 0] ** 2 + velocities[:, 1] ** 2).tolist())
+    if speedRange is not None:
+        minL, maxL = speedRange
+    else:
+        flattened = [val for sublist in lengths for val in sublist if not math.isnan(val)]
+        minL = min(flattened)
+        maxL = max(flattened)
 
     print(f"minL: {minL}, maxL: {maxL}")
     # ---- just in case .. eg if field function returns always Vector(1, 1)
@@ -93,55 +86,33 @@ def toSvgWithVelocityColors(bbox: BoundingBox, streamlines: List[List[Vector]],
         print("FAIL - all vectors have same lengths - no color encoding of vector lengths possible")
         return
 
-    # we define colors as numpy arrays for easier arithmetic when building gradient colors (more colors would look nicer, but here it's just a test)
-    color1 = np.array([0,70,135]) # dark blue
-    color2 = np.array([250, 253, 200]) # lighy yellow
-    color3 = np.array([166, 0, 33]) # dark red
-
-    def _getColor(idxSl: int, idxPt: int) -> str:
-        """
-        internal helper, LERP of 3 colors
-        """
-        l = (lengths[idxSl][idxPt - 1] + lengths[idxSl][idxPt]) / 2.0
-        # lerp
-        l01 = (l - minL) / (maxL - minL) # [0..1]
-
-        # simple linear gradient with 3 colors
-        if l01 <= 0.5:
-            ret = color2 * l01 * 2.0 + color1 * (0.5 - l01) * 2.0
-        else:
-            ret = color3 * (l01 - 0.5) * 2.0 + color2 * (1.0 - l01) * 2.0
-
-        #print(l01, ret)
-
-        return f"rgb({ret[0]},{ret[1]},{ret[2]})"
-        # return "green"
-
-
-    # ---- build svg
-    mySVG = Svg(width=bbox.width, height=bbox.height, viewBox=f"{bbox.topLeft.x} {bbox.topLeft.y} {bbox.width} {bbox.height}")
-    shapeBuilder = ShapeBuilder()
-    styleBuilder = StyleBuilder()
-    #styleBuilder.setStroke('blue')
-    styleBuilder.setFilling('none')
-    styleBuilder.setStrokeWidth('1px')
-    styleBuilder.setStrokeLineCap('round')
-
-    # background
-    mySVG.addElement(shapeBuilder.createRect(x=bbox.topLeft.x, y=bbox.topLeft.y, width="100%", height="100%", fill="black", stroke='none'))
-
-    # streamlines
-    for idxSl, sl in enumerate(streamlines):
-        for idxPt in range(1,len(sl)):
-            styleBuilder.setStroke(_getColor(idxSl, idxPt))
-            line = shapeBuilder.createLine(str(sl[idxPt-1].x), str(sl[idxPt-1].y), str(sl[idxPt].x), str(sl[idxPt].y))
-            line.set_style(styleBuilder.getStyle())
-            mySVG.addElement(line)
-
-    # save svg
-    # save svg
+    # ---- write svg, the segments are grouped by color (see SvgWriter and colorMap.velocityColors)
     print(f"writing {pathDestFile} ...")
-    mySVG.save(pathDestFile)
+    with SvgWriter(pathDestFile, bbox, background='black') as writer:
+        for sl, slLengths in zip(streamlines, lengths):
+            writer.addColoredStreamline(sl, normalizeSpeeds(slLengths, minL, maxL))
+
+
+
+def toPngWithVelocityColors(bbox: BoundingBox, streamlines: List[List[Vector]], speeds: List[List[float]], pathDestFile: str, scale: float = 2.0):
+    """
+    draw streamlines with colors encoded velocity directly to a png (no svg in between), see RasterRenderer
+    :param speeds: the vector lengths at the streamline points (StreamlineGenerator.getStreamlineSpeeds())
+    :param scale: pixels per unit of the bbox
+    """
+    flattened = np.concatenate([np.asarray(sublist, dtype=np.float64) for sublist in speeds])
+    minL = np.nanmin(flattened)
+    maxL = np.nanmax(flattened)
+    if minL == maxL:
+        print("FAIL - all vectors have same lengths - no color encoding of vector lengths possible")
+        return
+
+    renderer = RasterRenderer(bbox, int(bbox.width * scale), int(bbox.height * scale), lineWidth=scale)
+    for sl, slSpeeds in zip(streamlines, speeds):
+        renderer.addStreamline(sl, normalizeSpeeds(slSpeeds, minL, maxL))
+
+    print(f"writing {pathDestFile} ...")
+    renderer.savePng(pathDestFile)
 
 
 
@@ -162,6 +133,7 @@ INITIAL_SEED_POINT = Vector(10, 10)
 MY_TIME_STEP = 1.0
 MY_D_SEP = 10
 MY_D_TEST = 2
+SIMPLIFY_TOLERANCE = 0.05 # max. deviation of the simplified streamlines in the .svg files (see StreamlineCollection.simplified())
 
 
 
@@ -185,15 +157,42 @@ def exampleFlowFieldFunction(coords: Vector) -> Vector:
     )
 
 
+def exampleFlowFieldFunctionBatch(coords: np.ndarray) -> np.ndarray:
+    """
+    the same example function, vectorized: coords is an array of shape (N, 2), returns an array of shape (N, 2)
+    wrapped in a BatchFlowField it can be evaluated for many points at once
+    """
+    x = coords[:, 0]
+    y = coords[:, 1]
+    r = np.sqrt(x*x*0.01 + y*y*0.01)
+
+    return np.stack([r*(np.sin(x*0.01) + np.cos(r)), r], axis=1)
+
+
+
+
+
+def main():
+    # ---- generate the streamlines
+    theGenerator = StreamlineGenerator(exampleFlowFieldFunction, MY_D_SEP, MY_D_TEST)
+    theGenerator.setStepSize(MY_TIME_STEP)
+    streamlines = theGenerator.buildStreamlines(BOUNDING_BOX, INITIAL_SEED_POINT, compact=True)
+    print(f"{len(streamlines)} streamlines generated.")
 
+    # ---- writes streamlines to .svg files (mono and with color encoded velocity), simplified: fewer points, the
+    #      colors are kept within one of the color steps of the SvgWriter
+    speeds = np.concatenate(theGenerator.getStreamlineSpeeds())
+    speedRange = (float(np.nanmin(speeds)), float(np.nanmax(speeds))) # of the full streamlines, the same colors as the png
+    speedTolerance = (speedRange[1] - speedRange[0]) / SvgWriter.DEFAULT_NUM_COLORS
+    simplified = streamlines.simplified(SIMPLIFY_TOLERANCE, speedTolerance)
+    print(f"simplified: {simplified.numPoints()} of {streamlines.numPoints()} points")
+    toSvgPolylines(BOUNDING_BOX, simplified, './demo-out/streamlines-mono.svg')
+    toSvgWithVelocityColors(BOUNDING_BOX, simplified, BatchFlowField(exampleFlowFieldFunctionBatch), './demo-out/streamlines-color-velocity.svg',
+                            [simplified.speeds(idx) for idx in range(len(simplified))], speedRange)
 
+    # ---- draws the streamlines directly to a .png file (without svg)
+    toPngWithVelocityColors(BOUNDING_BOX, streamlines, theGenerator.getStreamlineSpeeds(), './demo-out/streamlines-color-velocity-raster.png')
 
-# ---- generate the streamlines
-theGenerator = StreamlineGenerator(exampleFlowFieldFunction, MY_D_SEP, MY_D_TEST)
-theGenerator.setStepSize(MY_TIME_STEP)
-streamlines = theGenerator.buildStreamlines(BOUNDING_BOX, INITIAL_SEED_POINT)
-print(f"{len(theGenerator._streamlines)} streamlines generated.")
 
-# ---- writes streamlines to .svg files (mono and with color encoded velocity)
-toSvgPolylines(BOUNDING_BOX, theGenerator._streamlines, './demo-out/streamlines-mono.svg')
-toSvgWithVelocityColors(BOUNDING_BOX, streamlines, exampleFlowFieldFunction, './demo-out/streamlines-color-velocity.svg')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,18 @@
 from typing import Union, Callable
 
+import numpy as np
+
 from Vector import Vector
 
 
-def rk4(pos: Vector, stepSize: float, getVelocity: Callable) -> Union[Vector, None]:
+def rk4(pos: Vector, stepSize: float, getVelocity: Callable, k1: Vector = None) -> Union[Vector, None]:
     """
     Performs Runge-Kutta 4th order integration.
+    k1 is the velocity at pos, if the caller already has it
     returns velocity vector
     """
-    k1 = getVelocity(pos)
+    if k1 is None:
+        k1 = getVelocity(pos)
     if not k1:
         return None
 
@@ -27,3 +31,30 @@ def rk4(pos: Vector, stepSize: float, getVelocity: Callable) -> Union[Vector, No
     res = k1 * (stepSize / 6) + k2 * (stepSize / 3) + k3 * (stepSize / 3) + k4 * (stepSize / 6)
 
     return res
+
+
+def rk4Batch(pos: np.ndarray, stepSize: float, getVelocityBatch: Callable, k1: np.ndarray = None) -> np.ndarray:
+    """
+    Performs Runge-Kutta 4th order integration for many points at once (lock-step).
+    pos is an array of shape (N, 2), getVelocityBatch gets and returns arrays of shape (M, 2) with NaN rows where the
+    velocity is not defined. k1 are the velocities at pos, if the caller already has them.
+    returns the velocity vectors as array of shape (N, 2), rows are NaN where one of the stages was not defined
+    """
+    res = np.full(pos.shape, np.nan, dtype=np.float64)
+    idxAlive = np.arange(len(pos)) # lanes where all stages so far are defined, only these are evaluated further
+    stages = []
+    for stageFactor in [0.0, 0.5, 0.5, 1.0]:
+        if len(idxAlive) == 0:
+            return res
+        if not stages:
+            k = getVelocityBatch(pos) if k1 is None else k1
+        else:
+            k = getVelocityBatch(pos[idxAlive] + stages[-1] * (stepSize * stageFactor))
+        alive = ~np.isnan(k).any(axis=1)
+        stages = [kPrev[alive] for kPrev in stages] + [k[alive]]
+        idxAlive = idxAlive[alive]
+
+    k1, k2, k3, k4 = stages
+    res[idxAlive] = k1 * (stepSize / 6) + k2 * (stepSize / 3) + k3 * (stepSize / 3) + k4 * (stepSize / 6)
+
+    return res
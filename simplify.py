@@ -0,0 +1,66 @@
+import numpy as np
+
+
+def simplifyIndexes(coords: np.ndarray, tolerance: float, values: np.ndarray = None, valueTolerance: float = None) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of a polyline, coords is an array of shape (N, 2)
+    returns the (sorted) indexes of the points to keep, always including the first and the last point.
+    No point of the polyline is farther than tolerance from the simplified polyline.
+
+    if values (shape (N,), e.g. the speeds for the colors) and valueTolerance are passed, a point is also kept if its
+    value differs by more than valueTolerance from the value interpolated (by arc length) along the simplified segment.
+    NaN values are kept as points.
+    """
+    numPoints = len(coords)
+    if numPoints < 3:
+        return np.arange(numPoints)
+
+    coords = np.asarray(coords, dtype=np.float64)
+    checkValues = values is not None and valueTolerance is not None
+    if checkValues:
+        values = np.asarray(values, dtype=np.float64)
+        segmentLengths = np.sqrt(((coords[1:] - coords[:-1]) ** 2).sum(axis=1))
+        arcLengths = np.concatenate([[0.0], np.cumsum(segmentLengths)])
+
+    keep = np.zeros(numPoints, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, numPoints - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # ---- distance of the inner points to the segment start .. end (relative to the tolerance)
+        a = coords[start]
+        ab = coords[end] - a
+        ap = coords[start + 1:end] - a
+        lengthSquared = ab[0] * ab[0] + ab[1] * ab[1]
+        if lengthSquared > 0:
+            t = np.clip((ap[:, 0] * ab[0] + ap[:, 1] * ab[1]) / lengthSquared, 0.0, 1.0)
+            ap = ap - t[:, np.newaxis] * ab
+        errors = np.sqrt(ap[:, 0] * ap[:, 0] + ap[:, 1] * ap[:, 1]) / tolerance if tolerance > 0 else np.full(len(ap), np.inf)
+
+        if checkValues:
+            length = arcLengths[end] - arcLengths[start]
+            s = (arcLengths[start + 1:end] - arcLengths[start]) / length if length > 0 else np.zeros(len(ap))
+            interpolated = values[start] + s * (values[end] - values[start])
+            valueErrors = np.abs(values[start + 1:end] - interpolated) / valueTolerance if valueTolerance > 0 else np.inf
+            errors = np.fmax(errors, np.nan_to_num(valueErrors, nan=np.inf))
+
+        idxMax = int(np.argmax(errors))
+        if errors[idxMax] > 1.0:
+            idxSplit = start + 1 + idxMax
+            keep[idxSplit] = True
+            stack.append((start, idxSplit))
+            stack.append((idxSplit, end))
+
+    return np.flatnonzero(keep)
+
+
+def simplifyPolyline(coords: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification of a polyline (array of shape (N, 2)), returns the kept points, see simplifyIndexes()
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+
+    return coords[simplifyIndexes(coords, tolerance)]
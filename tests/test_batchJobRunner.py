@@ -0,0 +1,30 @@
+"""
+BatchJobRunner: jobs without seed on a field which is singular at the center of the bbox
+(run: python -m pytest tests)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BatchJob import BatchJob
+from BatchJobRunner import runJob
+
+
+def test_jobWithoutSeedAvoidsTheSingularity(tmp_path):
+    # the example field of demo.py is singular at (0, 0), the center of the bbox
+    job = BatchJob.fromDict({'id': 'noSeed', 'field': 'demo:exampleFlowFieldFunction', 'bbox': [-50, -50, 100, 100],
+                             'dSep': 10, 'dTest': 2, 'output': 'noSeed.npz'}, str(tmp_path))
+    result = runJob(job)
+
+    assert result['ok'], result['error']
+    assert result['numStreamlines'] > 1
+
+
+def test_jobWithSingularSeedFails(tmp_path):
+    job = BatchJob.fromDict({'id': 'singular', 'field': 'demo:exampleFlowFieldFunction', 'bbox': [-50, -50, 100, 100],
+                             'seed': [0, 0], 'dSep': 10, 'dTest': 2, 'output': 'singular.svg'}, str(tmp_path))
+    result = runJob(job)
+
+    assert not result['ok']
+    assert 'single point' in result['error']
@@ -0,0 +1,56 @@
+"""
+StreamlineGenerator checkpoints: a resumed build gives the result of the uninterrupted one, a checkpoint of another
+setup is rejected
+(run: python -m pytest tests)
+"""
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from DormandPrinceIntegrator import DormandPrinceIntegrator
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+def demoField(coords: Vector) -> Vector:
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+BBOX = BoundingBox(-200, -150, 400, 300)
+SEED = Vector(10, 10)
+
+
+def writeCheckpoint(generator: StreamlineGenerator, path: str, numStreamlines: int):
+    for idxStreamline, _, _ in generator.iterStreamlines(BBOX, SEED):
+        if idxStreamline == numStreamlines - 1:
+            generator.saveCheckpoint(path)
+            return
+
+
+def test_resumedBuildIsIdentical(tmp_path):
+    path = str(tmp_path / 'checkpoint.npz')
+    expected = StreamlineGenerator(demoField, 10, 2).buildStreamlines(BBOX, SEED, compact=True).toArrays()
+
+    for numStreamlines in (1, 18, 61):
+        writeCheckpoint(StreamlineGenerator(demoField, 10, 2), path, numStreamlines)
+        resumed = StreamlineGenerator(demoField, 10, 2).buildStreamlinesFromCheckpoint(path, compact=True).toArrays()
+
+        for key in ('coords', 'offsets', 'directions', 'speeds'):
+            assert np.array_equal(resumed[key], expected[key], equal_nan=True), (numStreamlines, key)
+
+
+@pytest.mark.parametrize('kwargs', [{'lookupGridClass': ArrayLookupGrid}, {'integrator': DormandPrinceIntegrator()}])
+def test_checkpointOfAnotherSetupIsRejected(tmp_path, kwargs):
+    path = str(tmp_path / 'checkpoint.npz')
+    writeCheckpoint(StreamlineGenerator(demoField, 10, 2), path, 5)
+
+    with pytest.raises(Exception, match='another setup'):
+        StreamlineGenerator(demoField, 10, 2, **kwargs).buildStreamlinesFromCheckpoint(path)
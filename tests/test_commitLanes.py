@@ -0,0 +1,82 @@
+"""
+StreamlineGenerator._commitLanes(): the lanes of a batch of seed points give the streamlines of the sequential loop
+over the seed points
+(run: python -m pytest tests)
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+def demoField(coords: Vector) -> Vector:
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+def vortexInFlow(coords: Vector) -> Vector:
+    """
+    a vortex at (0, 0) in a uniform flow, the streamlines near the vortex are closed, the ones outside of the
+    stagnation point (0, 50) pass them at a varying distance
+    """
+    r2 = coords.x * coords.x + coords.y * coords.y
+    if r2 == 0:
+        return None
+    return Vector(1 - 50 * coords.y / r2, 50 * coords.x / r2)
+
+
+def commit(field, bbox: BoundingBox, seedPoints, lockStep: bool):
+    """
+    returns the arrays of the streamlines and the number of streamlines which were built one by one
+    """
+    generator = StreamlineGenerator(field, 10, 2)
+    generator._initObjects(bbox)
+
+    numBuilt = [0]
+    buildStreamline = generator._buildStreamline
+    def countingBuildStreamline(seedPoint):
+        numBuilt[0] += 1
+        buildStreamline(seedPoint)
+    generator._buildStreamline = countingBuildStreamline
+    generator._commitSeedPoints(seedPoints, lockStep)
+
+    return generator._streamlines.toArrays(), numBuilt[0]
+
+
+def assertSameStreamlines(lanes: dict, sequential: dict):
+    for key in ('coords', 'offsets', 'speeds'):
+        assert np.array_equal(lanes[key], sequential[key]), key
+    # the batch path normalizes in numpy, the last bit may differ (see StreamlineGenerator._lengths())
+    np.testing.assert_allclose(lanes['directions'], sequential['directions'], rtol=0, atol=1e-12)
+
+
+def test_lanesOfALattice():
+    # 60 seed points, the streamlines of the later ones are truncated at the earlier ones or skipped
+    bbox = BoundingBox(-200, -150, 400, 300)
+    seedPoints = [Vector(x, y) for y in range(-140, 150, 50) for x in range(-190, 200, 40)]
+    lanes, _ = commit(demoField, bbox, seedPoints, True)
+    sequential, _ = commit(demoField, bbox, seedPoints, False)
+
+    assert len(seedPoints) == 60
+    assert len(lanes['offsets']) > 20
+    assertSameStreamlines(lanes, sequential)
+
+
+def test_laneWhichStoppedAtItsTruncatedForwardPart():
+    # the first lane passes the closed streamline of the second one, which is truncated there, its backward part
+    # stopped at its own forward part (SELF_HIT) and is built again
+    bbox = BoundingBox(-150, -150, 300, 300)
+    seedPoints = [Vector(15, 50), Vector(0, 40)]
+    lanes, numRebuilt = commit(vortexInFlow, bbox, seedPoints, True)
+    sequential, _ = commit(vortexInFlow, bbox, seedPoints, False)
+
+    assert numRebuilt == 1
+    assert len(lanes['offsets']) == 3
+    assertSameStreamlines(lanes, sequential)
@@ -0,0 +1,66 @@
+"""
+the exact grid backends must give the same results as LookupGrid, also for the seed point candidates at exactly dSep,
+the approximate DistanceFieldGrid must not accept points nearer than dTest
+(run: python -m pytest tests)
+"""
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from DistanceFieldGrid import DistanceFieldGrid
+from LookupGrid import LookupGrid
+from SparseLookupGrid import SparseLookupGrid
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+EXACT_BACKENDS = [ArrayLookupGrid, SparseLookupGrid]
+
+
+def demoField(coords: Vector) -> Vector:
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+@pytest.mark.parametrize('gridClass', EXACT_BACKENDS)
+def test_tieAtMinDistance(gridClass):
+    # the distance is 10 up to rounding: dx ** 2 + dy ** 2 and dx * dx + dy * dy may round differently
+    bbox = BoundingBox(-400, -300, 800, 600)
+    sample = Vector(-60.159787111692054, -58.06438608284429)
+    pt = Vector(-53.26858793255907, -50.81791288041561)
+    expected = LookupGrid(bbox, 10)
+    expected.addSamplePoint(sample)
+    grid = gridClass(bbox, 10)
+    grid.addSamplePoint(sample)
+
+    assert grid.isPointValid(pt, 10) == expected.isPointValid(pt, 10)
+    assert grid.arePointsValid(np.array([[pt.x, pt.y]]), 10).tolist() == [expected.isPointValid(pt, 10)]
+
+
+@pytest.mark.parametrize('gridClass', EXACT_BACKENDS)
+def test_sameStreamlinesAsLookupGrid(gridClass):
+    # the 400x300 demo canvas has no seed point candidates whose check depends on the rounding, 800x600 has
+    bbox = BoundingBox(-400, -300, 800, 600)
+    expected = StreamlineGenerator(demoField, 10, 2).buildStreamlines(bbox, Vector(10, 10), compact=True).toArrays()
+    result = StreamlineGenerator(demoField, 10, 2, lookupGridClass=gridClass).buildStreamlines(bbox, Vector(10, 10), compact=True).toArrays()
+
+    assert np.array_equal(result['offsets'], expected['offsets'])
+    assert np.array_equal(result['coords'], expected['coords'])
+
+
+def test_distanceFieldGridKeepsDTest():
+    # the interpolated distance overestimates, by default no point nearer than dTest is accepted
+    bbox = BoundingBox(-200, -150, 400, 300)
+    streamlines = StreamlineGenerator(demoField, 10, 2, lookupGridClass=DistanceFieldGrid).buildStreamlines(bbox, Vector(10, 10), compact=True)
+
+    grid = ArrayLookupGrid(bbox, 10)
+    for streamline in streamlines:
+        assert grid.arePointsValid(streamline, 2).all()
+        grid.addPoints(streamline)
@@ -0,0 +1,34 @@
+"""
+the integrator passed to StreamlineGenerator is used for all streamlines
+(run: python -m pytest tests)
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from BoundingBox import BoundingBox
+from DormandPrinceIntegrator import DormandPrinceIntegrator
+from StreamlineGenerator import StreamlineGenerator
+from Vector import Vector
+
+
+def demoField(coords: Vector) -> Vector:
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+def test_seedPointsUseTheIntegrator():
+    bbox = BoundingBox(-100, -75, 200, 150)
+    seedPoint = Vector(10, 10)
+    expected = StreamlineGenerator(demoField, 10, 2, integrator=DormandPrinceIntegrator(1e-6)).buildStreamlines(bbox, seedPoint, compact=True)[0]
+    fixedSteps = StreamlineGenerator(demoField, 10, 2).buildStreamlinesFromSeeds(bbox, [seedPoint], compact=True)[0]
+    generator = StreamlineGenerator(demoField, 10, 2, integrator=DormandPrinceIntegrator(1e-6))
+    streamline = generator.buildStreamlinesFromSeeds(bbox, [seedPoint, Vector(-40, 30)], compact=True)[0]
+
+    # the streamline of the first seed point is built with the adaptive integrator, like the first one of buildStreamlines()
+    assert np.array_equal(streamline, expected)
+    assert not np.array_equal(streamline, fixedSteps)
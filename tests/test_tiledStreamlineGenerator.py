@@ -0,0 +1,61 @@
+"""
+TiledStreamlineGenerator: tiles whose center is a singularity of the field, streamlines across the tile borders
+(run: python -m pytest tests)
+"""
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ArrayLookupGrid import ArrayLookupGrid
+from BoundingBox import BoundingBox
+from StreamlineGenerator import StreamlineGenerator
+from TiledStreamlineGenerator import TiledStreamlineGenerator, _buildTile
+from Vector import Vector
+
+
+def vortexField(coords: Vector) -> Vector:
+    """
+    circles around (0, 0), the center is a singularity (module level, so it can be passed to the worker processes)
+    """
+    return Vector(-coords.y, coords.x)
+
+
+def demoField(coords: Vector) -> Vector:
+    r = math.sqrt(coords.x * coords.x * 0.01 + coords.y * coords.y * 0.01)
+    return Vector(r * (math.sin(coords.x * 0.01) + math.cos(r)), r)
+
+
+def test_streamlinesAreJoinedAcrossTileBorders():
+    bbox = BoundingBox(-200, -150, 400, 300)
+    sequential = StreamlineGenerator(demoField, 10, 2).buildStreamlines(bbox, Vector(10, 10), compact=True)
+    streamlines = TiledStreamlineGenerator(demoField, 10, 2, numTilesX=3, numTilesY=2, maxWorkers=2).buildStreamlines(bbox, Vector(10, 10), compact=True)
+
+    # not split into pieces at the borders (124 streamlines, 215 pieces if they were split)
+    assert len(streamlines) < 1.25 * len(sequential)
+    assert streamlines.numPoints() > 0.9 * sequential.numPoints()
+
+    # the streamlines are dTest apart
+    grid = ArrayLookupGrid(bbox, 10)
+    for streamline in streamlines:
+        assert grid.arePointsValid(streamline, 2).all()
+        grid.addPoints(streamline)
+
+
+def test_singularCenterOfASingleTile():
+    bbox = BoundingBox(-150, -100, 300, 200)
+    generator = TiledStreamlineGenerator(vortexField, 10, 2, numTilesX=1, numTilesY=1, maxWorkers=1)
+    streamlines = generator.buildStreamlines(bbox, compact=True)
+
+    assert len(streamlines) > 10
+    assert streamlines.numPoints() > 1000
+
+
+def test_singularCenterOfTheMiddleTile():
+    bbox = BoundingBox(-150, -150, 300, 300)
+    generator = TiledStreamlineGenerator(vortexField, 10, 2, numTilesX=3, numTilesY=3, maxWorkers=1)
+    tile = generator._tiles(bbox)[4] # its center is (0, 0)
+    job = (vortexField, 10, 2, 1.0, generator._lookupGridClass, generator._withHalo(tile, bbox), generator._seedCandidates(tile))
+
+    assert _buildTile(job).numPoints() > 100